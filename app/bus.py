@@ -1,12 +1,15 @@
-from dataclasses import dataclass
+from __future__ import annotations
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Literal, Any
+from typing import Literal, Any, Union
 import asyncio
+import time
 
 # Commands the app understands
 CommandType = Literal[
     "stop",
     "check_pdf_folder",
+    "drain_pdf_folder", # every pending PDF, oldest first
     "pdf_detected",     # payload: Path
     "ws_send",          # payload: dict
     "play_pause",
@@ -23,11 +26,50 @@ CommandType = Literal[
 class Command:
     type: CommandType
     payload: Any = None
+    created: float = field(default_factory=time.monotonic, compare=False)  # for latency metrics
+
+@dataclass(frozen=True)
+class BinaryPayload:
+    """Outbound message sent as a JSON header frame followed by raw binary frames."""
+    header: dict
+    data: bytes | bytearray | memoryview
+    chunk_size: int = 256 * 1024
+
+    def chunks(self):
+        """Yield zero-copy memoryview slices of the body, one per binary frame."""
+        view = memoryview(self.data)
+        for start in range(0, len(view), self.chunk_size):
+            yield view[start:start + self.chunk_size]
+
+    def chunk_count(self) -> int:
+        return -(-len(self.data) // self.chunk_size)
+
+Outbound = Union[dict, BinaryPayload]
+
+# Outbound priority lanes, highest first
+LANES = ("interactive", "transcription", "bulk")
+_TRANSCRIPTION_COMMANDS = {"get_transcription", "save_edited_transcription"}
+_BULK_COMMANDS = {"submit_pdf"}
+
+def lane_for(payload: Outbound) -> str:
+    """Lane an outbound message travels in: uploads are bulk, transcription traffic sits in
+    the middle, and everything else (audio transport, acks) is interactive."""
+    if isinstance(payload, BinaryPayload):
+        return "bulk"
+    command = payload.get("command") if isinstance(payload, dict) else None
+    if command in _BULK_COMMANDS:
+        return "bulk"
+    if command in _TRANSCRIPTION_COMMANDS:
+        return "transcription"
+    return "interactive"
 
 class Bus:
-    def __init__(self) -> None:
+    def __init__(self, outbound=None, events=None) -> None:
+        from .spool import OutboundSpool  # spool imports BinaryPayload from here
+        from .events import EventHub
         self.commands: asyncio.Queue[Command] = asyncio.Queue()
-        self.outbound: asyncio.Queue[dict] = asyncio.Queue()  # to WS
+        self.outbound: OutboundSpool = outbound or OutboundSpool()  # to WS, disk-backed when configured
+        self.events: EventHub = events if events is not None else EventHub()  # state changes for displays
 
 
 
@@ -0,0 +1,179 @@
+from __future__ import annotations
+import asyncio
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from .log import get_logger
+
+log = get_logger("clipboard")
+
+class _CommandBackend:
+    """Clipboard through a command line tool (xclip, xsel, wl-copy), with a hard timeout."""
+
+    def __init__(self, name: str, copy_cmd: list[str], paste_cmd: list[str]):
+        self.name = name
+        self.copy_cmd = copy_cmd
+        self.paste_cmd = paste_cmd
+
+    def available(self) -> bool:
+        return shutil.which(self.copy_cmd[0]) is not None and shutil.which(self.paste_cmd[0]) is not None
+
+    def copy(self, text: str, timeout: float):
+        subprocess.run(self.copy_cmd, input=text.encode("utf-8"), timeout=timeout, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def paste(self, timeout: float) -> str:
+        result = subprocess.run(self.paste_cmd, capture_output=True, timeout=timeout, check=True)
+        return result.stdout.decode("utf-8", errors="replace")
+
+class _PyperclipBackend:
+    """pyperclip: the only option on Windows/macOS. It can't be timed out, so on
+    Linux it comes after the command line tools."""
+    name = "pyperclip"
+
+    def __init__(self):
+        self._pyperclip = None
+
+    def available(self) -> bool:
+        try:
+            import pyperclip
+        except ImportError:
+            return False
+        self._pyperclip = pyperclip
+        return True
+
+    def copy(self, text: str, timeout: float):
+        self._pyperclip.copy(text)
+
+    def paste(self, timeout: float) -> str:
+        return self._pyperclip.paste()
+
+BACKENDS = {
+    "wl-copy": lambda: _CommandBackend("wl-copy", ["wl-copy"], ["wl-paste", "--no-newline"]),
+    "xclip": lambda: _CommandBackend("xclip", ["xclip", "-selection", "clipboard"],
+                                     ["xclip", "-selection", "clipboard", "-o"]),
+    "xsel": lambda: _CommandBackend("xsel", ["xsel", "--clipboard", "--input"], ["xsel", "--clipboard", "--output"]),
+    "pyperclip": _PyperclipBackend,
+}
+
+def default_backends() -> list[str]:
+    if sys.platform.startswith("linux"):
+        names = ["xclip", "xsel", "pyperclip"]
+        if os.environ.get("WAYLAND_DISPLAY"):
+            names.insert(0, "wl-copy")
+        return names
+    return ["pyperclip"]
+
+class Clipboard:
+    """Clipboard access on a dedicated thread, so the event loop never waits on xclip & co.
+
+    Requests are queued to the worker thread, which tries the backends in
+    order and sticks with the first one that works. Each call is bounded by
+    `timeout_s`.
+    """
+
+    def __init__(self, backends: list[str] | None = None, timeout_s: float = 1.0):
+        names = list(backends) if backends else default_backends()
+        unknown = [n for n in names if n not in BACKENDS]
+        if unknown:
+            raise ValueError(f"Unknown clipboard backend(s) {unknown}, expected some of {list(BACKENDS)}")
+        self.backend_names = names
+        self.timeout_s = timeout_s
+        self._backends = None  # resolved on the worker thread
+        self._requests: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+
+    def _submit(self, op: str, *args) -> asyncio.Future:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="clipboard", daemon=True)
+            self._thread.start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._requests.put((op, args, loop, future))
+        return future
+
+    def copy_nowait(self, text: str) -> asyncio.Future:
+        """Queue a copy; the returned future resolves to True once it is on the clipboard."""
+        return self._submit("copy", text)
+
+    async def copy(self, text: str) -> bool:
+        try:
+            return await asyncio.wait_for(self.copy_nowait(text), self.timeout_s)
+        except asyncio.TimeoutError:
+            log.warning("⚠️ Clipboard copy timed out after %.1fs", self.timeout_s)
+            return False
+
+    async def paste(self) -> str | None:
+        """Current clipboard text, or None if no backend could read it in time."""
+        try:
+            return await asyncio.wait_for(self._submit("paste"), self.timeout_s)
+        except asyncio.TimeoutError:
+            log.warning("⚠️ Clipboard paste timed out after %.1fs", self.timeout_s)
+            return None
+
+    def stop(self):
+        if self._thread is not None:
+            self._requests.put(None)
+
+    # Worker thread
+
+    def _run(self):
+        self._backends = [b for b in (BACKENDS[n]() for n in self.backend_names) if b.available()]
+        if not self._backends:
+            log.error("❌ No clipboard backend available (tried %s)", ", ".join(self.backend_names))
+        while (request := self._requests.get()) is not None:
+            op, args, loop, future = request
+            if op == "copy":
+                result = self._copy(*args)
+            else:
+                result = self._paste()
+            loop.call_soon_threadsafe(_resolve, future, result)
+
+    def _copy(self, text: str) -> bool:
+        return self._call("copy", text) is not None
+
+    def _paste(self) -> str | None:
+        return self._call("paste")
+
+    def _call(self, op: str, *args):
+        """Run `op` on the first backend that works; a working backend moves to the front."""
+        for i, backend in enumerate(self._backends):
+            try:
+                started = time.perf_counter()
+                result = getattr(backend, op)(*args, self.timeout_s)
+            except Exception as e:
+                log.debug("Clipboard %s via %s failed: %s", op, backend.name, e)
+                continue
+            if i:
+                self._backends.insert(0, self._backends.pop(i))
+                log.info("📋 Clipboard now using %s", backend.name)
+            log.debug("Clipboard %s via %s took %.1f ms", op, backend.name, (time.perf_counter() - started) * 1000)
+            return True if result is None else result
+        log.error("❌ Clipboard %s failed on every backend", op)
+        return None
+
+class NoClipboard:
+    """Clipboard of a session with no desktop of its own (multi-session mode):
+    sharing the process's clipboard would leak text between operators."""
+
+    def copy_nowait(self, text: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(False)
+        return future
+
+    async def copy(self, text: str) -> bool:
+        return False
+
+    async def paste(self) -> str | None:
+        return None
+
+    def stop(self):
+        pass
+
+def _resolve(future: asyncio.Future, result):
+    if not future.done():  # the caller may have timed out
+        future.set_result(result)
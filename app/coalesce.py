@@ -0,0 +1,46 @@
+from __future__ import annotations
+import asyncio
+from typing import Awaitable, Callable
+
+class SeekCoalescer:
+    """Merge bursts of seek presses into one net-offset message.
+
+    The first seek opens a window of `window_ms`; every seek inside it is
+    folded into a running offset, and the window is emitted once when it
+    closes or when flush() is called (e.g. by a non-seek command, to keep
+    ordering). window_ms = 0 emits every seek immediately.
+    """
+
+    def __init__(self, emit: Callable[[int, int, str], Awaitable[None]], window_ms: int = 120):
+        self.emit = emit  # emit(net_offset, seek_count, last_direction)
+        self.window_ms = window_ms
+        self._offset = 0
+        self._count = 0
+        self._direction = "forward"
+        self._timer: asyncio.Task | None = None
+
+    async def add(self, offset: int, direction: str):
+        self._offset += offset
+        self._count += 1
+        self._direction = direction
+        if self.window_ms <= 0:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._close_window())
+
+    async def _close_window(self):
+        await asyncio.sleep(self.window_ms / 1000)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self):
+        """Emit the pending net seek, if any."""
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+            self._timer = None
+        if not self._count:
+            return
+        # Reset before awaiting so a concurrent flush can't emit the same window twice
+        offset, count, direction = self._offset, self._count, self._direction
+        self._offset, self._count = 0, 0
+        await self.emit(offset, count, direction)
@@ -0,0 +1,84 @@
+from __future__ import annotations
+import json
+from .log import get_logger
+
+log = get_logger("codec")
+
+# orjson and msgpack are optional, only needed for ws_codec = "orjson" / "msgpack"
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+CODECS = ("json", "orjson", "msgpack")
+
+def _json_loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+class Codec:
+    """Wire format for WebSocket messages.
+
+    Text frames are always JSON, so replies from a server that doesn't speak
+    the selected codec still decode; binary frames use the codec itself.
+    """
+    name = "json"
+    binary = False  # True if encode() returns bytes (sent as binary frames)
+
+    def encode(self, payload: dict) -> str | bytes:
+        return json.dumps(payload)
+
+    def decode(self, message: str | bytes):
+        return json.loads(message)
+
+    def batch(self, frames: list) -> str | bytes:
+        """{"command": "batch", "messages": [...]} around already-encoded messages."""
+        return '{"command":"batch","messages":[' + ",".join(frames) + "]}"
+
+    def headers(self) -> dict:
+        """Handshake header telling the server which codec this client sends."""
+        return {"X-Client-Codec": self.name}
+
+class ORJSONCodec(Codec):
+    """Same JSON on the wire, serialised/parsed by orjson."""
+    name = "orjson"
+
+    def encode(self, payload: dict) -> str:
+        return orjson.dumps(payload).decode()
+
+    def decode(self, message: str | bytes):
+        return orjson.loads(message)
+
+class MsgpackCodec(Codec):
+    """MessagePack in binary frames; bytes values travel as-is instead of hex/base64."""
+    name = "msgpack"
+    binary = True
+
+    def encode(self, payload: dict) -> bytes:
+        return msgpack.packb(payload, use_bin_type=True)
+
+    def decode(self, message: str | bytes):
+        if isinstance(message, str):
+            return _json_loads(message)
+        return msgpack.unpackb(message, raw=False)
+
+    def batch(self, frames: list) -> bytes:
+        packer = msgpack.Packer(use_bin_type=True)
+        head = (packer.pack_map_header(2) + packer.pack("command") + packer.pack("batch")
+                + packer.pack("messages") + packer.pack_array_header(len(frames)))
+        return head + b"".join(frames)
+
+def make_codec(name: str = "json") -> Codec:
+    if name not in CODECS:
+        raise ValueError(f"ws_codec must be one of {CODECS}, got {name!r}")
+    if name == "orjson" and orjson is None:
+        log.warning("⚠️ orjson is not installed, falling back to json")
+        name = "json"
+    if name == "msgpack" and msgpack is None:
+        log.warning("⚠️ msgpack is not installed, falling back to json")
+        name = "json"
+    return {"json": Codec, "orjson": ORJSONCodec, "msgpack": MsgpackCodec}[name]()
@@ -0,0 +1,105 @@
+from __future__ import annotations
+import asyncio
+from pathlib import Path
+from websockets import frames
+from websockets.extensions.permessage_deflate import ClientPerMessageDeflateFactory, PerMessageDeflate
+from .log import get_logger
+
+log = get_logger("compression")
+
+# zstandard is optional, only needed for ws_compression = "zstd"
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_MODES = ("deflate", "zstd", "none")
+
+# Above this size compression runs on a worker thread instead of the loop
+_OFFLOAD_BYTES = 1024 * 1024
+
+class _SelectiveDeflate(PerMessageDeflate):
+    """permessage-deflate that leaves small (and optionally binary) messages uncompressed.
+
+    RFC 7692 lets the sender choose per message: frames without RSV1 are plain.
+    """
+    min_bytes = 0
+    compress_binary = False
+
+    def encode(self, frame: frames.Frame) -> frames.Frame:
+        if frame.opcode is frames.OP_BINARY and not self.compress_binary:
+            return frame
+        if frame.opcode is frames.OP_TEXT and frame.fin and len(frame.data) < self.min_bytes:
+            return frame
+        return super().encode(frame)
+
+class _SelectiveDeflateFactory(ClientPerMessageDeflateFactory):
+    def __init__(self, min_bytes: int, compress_binary: bool, **kwargs):
+        super().__init__(**kwargs)
+        self.min_bytes = min_bytes
+        self.compress_binary = compress_binary
+
+    def process_response_params(self, params, accepted_extensions):
+        extension = super().process_response_params(params, accepted_extensions)
+        extension.__class__ = _SelectiveDeflate
+        extension.min_bytes = self.min_bytes
+        extension.compress_binary = self.compress_binary
+        return extension
+
+class Compressor:
+    """Outbound compression strategy: negotiated permessage-deflate, zstd frames, or none."""
+
+    def __init__(self, mode: str = "deflate", min_bytes: int = 1024, level: int = 6,
+                 window_bits: int = 15, dict_path: str = "", compress_binary: bool = False):
+        if mode not in COMPRESSION_MODES:
+            raise ValueError(f"ws_compression must be one of {COMPRESSION_MODES}, got {mode!r}")
+        if mode == "zstd" and zstandard is None:
+            log.warning("⚠️ zstandard is not installed, falling back to permessage-deflate")
+            mode = "deflate"
+        self.mode = mode
+        self.min_bytes = min_bytes
+        self.level = level
+        self.window_bits = window_bits
+        self.compress_binary = compress_binary
+        self._zstd = None
+        self._dict_id = 0
+        if mode == "zstd":
+            zdict = None
+            if dict_path:
+                zdict = zstandard.ZstdCompressionDict(Path(dict_path).read_bytes())
+                self._dict_id = zdict.dict_id()
+            self._zstd_dict = zdict
+            self._zstd = zstandard.ZstdCompressor(level=level, dict_data=zdict)
+
+    def connect_kwargs(self) -> dict:
+        """Keyword arguments for websockets.connect() implementing this strategy."""
+        if self.mode == "deflate":
+            factory = _SelectiveDeflateFactory(
+                self.min_bytes,
+                self.compress_binary,
+                client_max_window_bits=self.window_bits,
+                server_max_window_bits=self.window_bits,
+                compress_settings={"level": self.level, "memLevel": 8},
+            )
+            return {"compression": None, "extensions": [factory]}
+        return {"compression": None}
+
+    def headers(self) -> dict:
+        """Handshake headers advertising application-level compression to the server."""
+        if self.mode != "zstd":
+            return {}
+        value = f"zstd; min-bytes={self.min_bytes}"
+        if self._dict_id:
+            value += f"; dict-id={self._dict_id}"
+        return {"X-Client-Compression": value}
+
+    async def encode(self, text: str | bytes) -> str | bytes:
+        """Return the frame to send: the message itself, or a zstd binary frame for large payloads."""
+        if self._zstd is None or len(text) < self.min_bytes:
+            return text
+        data = text.encode("utf-8") if isinstance(text, str) else text
+        if len(data) >= _OFFLOAD_BYTES:
+            # ZstdCompressor is not thread-safe; use a fresh one off-loop
+            compressor = zstandard.ZstdCompressor(level=self.level, dict_data=self._zstd_dict)
+            return await asyncio.get_running_loop().run_in_executor(None, compressor.compress, data)
+        return self._zstd.compress(data)
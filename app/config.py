@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from __future__ import annotations
+from dataclasses import dataclass, field
 from pathlib import Path
 import os
 
@@ -10,16 +11,82 @@ except ImportError:
 
 @dataclass(frozen=True)
 class Config:
-    ws_url: str
+    ws_url: str  # preferred endpoint (first of ws_urls)
     pdf_dir: Path
+    ws_urls: tuple[str, ...] = ()  # all endpoints, in order of preference
     http_host: str = "127.0.0.1"
     http_port: int = 8080
+    events_buffer_size: int = 64
+    events_keepalive_s: float = 15.0
     hotkey_stop: str = "f1"
     hotkey_check_pdf: str = "f2"
+    hotkey_debounce_ms: int = 30
+    hotkey_hold_delay_ms: int = 350
+    hotkey_hold_repeat_ms: int = 100
+    hotkey_hold_max_s: float = 10.0  # a hold stops after this even without a key-up
+    hotkey_hold_commands: tuple[str, ...] = ("backward_audio", "forward_audio")
+    hotkey_rate_limits: dict = field(default_factory=dict)  # command -> max per second
     pdf_glob: str = "*.pdf"
     pdf_wait_window_s: int = 5
+    pdf_watch_step_ms: int = 50
+    pdf_auto_submit: bool = False
+    pdf_ready_stable_ms: int = 500
+    pdf_ready_timeout_s: float = 30.0
+    pdf_require_eof: bool = True
+    pdf_drain_concurrency: int = 4
+    pdf_drain_on_startup: bool = True
+    pdf_transfer_mode: str = "hex"  # "hex" (JSON) or "binary" (header + raw frames)
+    pdf_chunk_size: int = 256 * 1024
+    seek_coalesce_ms: int = 120
+    max_inflight_commands: int = 4
+    io_workers: int = 4
+    io_chunk_size: int = 1024 * 1024
+    ws_codec: str = "json"  # "json", "orjson" or "msgpack"
+    ws_batch_max_items: int = 1  # > 1 sends backlogs as batch frames (server must support it)
+    ws_batch_max_bytes: int = 64 * 1024
+    ws_batch_max_ms: float = 5.0
+    ws_compression: str = "deflate"  # "deflate", "zstd" or "none"
+    ws_compression_min_bytes: int = 1024
+    ws_compression_level: int = 6
+    ws_deflate_window_bits: int = 15
+    ws_compress_binary: bool = False
+    zstd_dict_path: str = ""
+    spool_path: str = "./outbound_spool.bin"  # empty string keeps the outbound queue in memory
+    spool_compact_bytes: int = 64 * 1024 * 1024
+    spool_fsync: bool = False
+    request_timeout_s: float = 5.0
     reconnect_base_s: float = 0.5
     reconnect_max_s: float = 15.0
+    heartbeat_interval_s: float = 5.0
+    stall_rtt_s: float = 3.0
+    stall_silence_s: float = 15.0
+    ws_probe_timeout_s: float = 2.0
+    ws_failover_cooldown_s: float = 10.0
+    ws_failback_interval_s: float = 30.0  # 0 = stay on the fallback endpoint
+    ws_latency_tolerance_ms: int = 20
+    clipboard_backends: tuple[str, ...] = ()  # e.g. ("xclip", "xsel", "pyperclip"), empty = per platform
+    clipboard_timeout_s: float = 1.0
+    transcription_cache_size: int = 32  # 0 disables the cache
+    transcription_revalidate: bool = True
+    save_as_patch: bool = False  # server must support transcription_patch
+    startup_ws_wait_s: float = 2.0
+    startup_profile: bool = False
+    multi_session: bool = False  # one process, one isolated session per user_id
+    max_sessions: int = 64
+    session_users: tuple[str, ...] = ()  # sessions opened at startup
+    log_level: str = "INFO"
+    log_levels: dict = field(default_factory=dict)  # per component, e.g. {"ws": "DEBUG"}
+    log_file: str = ""  # JSON-lines sink, empty = console only
+    log_max_field_chars: int = 200
+
+def _parse_urls(value) -> tuple[str, ...]:
+    """ws_url may be one URL, a TOML list, or a comma-separated string (WS_URL env var)."""
+    if isinstance(value, str):
+        value = value.split(",")
+    urls = tuple(u.strip() for u in value if u.strip())
+    if not urls:
+        raise ValueError("ws_url must contain at least one WebSocket URL")
+    return urls
 
 def load_config() -> Config:
     path = Path(__file__).resolve().parent.parent / "app.toml"
@@ -27,15 +94,73 @@ def load_config() -> Config:
     if path.exists():
         with path.open("rb") as f:
             data = tomllib.load(f)
+    ws_urls = _parse_urls(os.getenv("WS_URL") or data.get("ws_url", "ws://150.1.6.144:6790"))
     return Config(
-        ws_url = os.getenv("WS_URL", data.get("ws_url", "ws://150.1.6.144:6790")),
+        ws_url = ws_urls[0],
+        ws_urls = ws_urls,
         pdf_dir = Path(os.getenv("PDF_DIR", data.get("pdf_dir", "./pdf_for_submission"))).resolve(),
         http_host = data.get("http_host", "127.0.0.1"),
         http_port = int(data.get("http_port", 8080)),
+        events_buffer_size = int(data.get("events_buffer_size", 64)),
+        events_keepalive_s = float(data.get("events_keepalive_s", 15.0)),
         hotkey_stop = data.get("hotkey_stop", "f1"),
         hotkey_check_pdf = data.get("hotkey_check_pdf", "f2"),
+        hotkey_debounce_ms = int(data.get("hotkey_debounce_ms", 30)),
+        hotkey_hold_delay_ms = int(data.get("hotkey_hold_delay_ms", 350)),
+        hotkey_hold_repeat_ms = int(data.get("hotkey_hold_repeat_ms", 100)),
+        hotkey_hold_max_s = float(data.get("hotkey_hold_max_s", 10.0)),
+        hotkey_hold_commands = tuple(data.get("hotkey_hold_commands", ("backward_audio", "forward_audio"))),
+        hotkey_rate_limits = {k: float(v) for k, v in data.get("hotkey_rate_limits", {}).items()},
         pdf_glob = data.get("pdf_glob", "*.pdf"),
         pdf_wait_window_s = int(data.get("pdf_wait_window_s", 5)),
+        pdf_watch_step_ms = int(data.get("pdf_watch_step_ms", 50)),
+        pdf_auto_submit = bool(data.get("pdf_auto_submit", False)),
+        pdf_ready_stable_ms = int(data.get("pdf_ready_stable_ms", 500)),
+        pdf_ready_timeout_s = float(data.get("pdf_ready_timeout_s", 30.0)),
+        pdf_require_eof = bool(data.get("pdf_require_eof", True)),
+        pdf_drain_concurrency = int(data.get("pdf_drain_concurrency", 4)),
+        pdf_drain_on_startup = bool(data.get("pdf_drain_on_startup", True)),
+        pdf_transfer_mode = data.get("pdf_transfer_mode", "hex"),
+        pdf_chunk_size = int(data.get("pdf_chunk_size", 256 * 1024)),
+        seek_coalesce_ms = int(data.get("seek_coalesce_ms", 120)),
+        max_inflight_commands = int(data.get("max_inflight_commands", 4)),
+        io_workers = int(data.get("io_workers", 4)),
+        io_chunk_size = int(data.get("io_chunk_size", 1024 * 1024)),
+        ws_codec = data.get("ws_codec", "json"),
+        ws_batch_max_items = int(data.get("ws_batch_max_items", 1)),
+        ws_batch_max_bytes = int(data.get("ws_batch_max_bytes", 64 * 1024)),
+        ws_batch_max_ms = float(data.get("ws_batch_max_ms", 5.0)),
+        ws_compression = data.get("ws_compression", "deflate"),
+        ws_compression_min_bytes = int(data.get("ws_compression_min_bytes", 1024)),
+        ws_compression_level = int(data.get("ws_compression_level", 6)),
+        ws_deflate_window_bits = int(data.get("ws_deflate_window_bits", 15)),
+        ws_compress_binary = bool(data.get("ws_compress_binary", False)),
+        zstd_dict_path = data.get("zstd_dict_path", ""),
+        spool_path = data.get("spool_path", "./outbound_spool.bin"),
+        spool_compact_bytes = int(data.get("spool_compact_bytes", 64 * 1024 * 1024)),
+        spool_fsync = bool(data.get("spool_fsync", False)),
+        request_timeout_s = float(data.get("request_timeout_s", 5.0)),
         reconnect_base_s = float(data.get("reconnect_base_s", 0.5)),
         reconnect_max_s = float(data.get("reconnect_max_s", 15.0)),
+        heartbeat_interval_s = float(data.get("heartbeat_interval_s", 5.0)),
+        stall_rtt_s = float(data.get("stall_rtt_s", 3.0)),
+        stall_silence_s = float(data.get("stall_silence_s", 15.0)),
+        ws_probe_timeout_s = float(data.get("ws_probe_timeout_s", 2.0)),
+        ws_failover_cooldown_s = float(data.get("ws_failover_cooldown_s", 10.0)),
+        ws_failback_interval_s = float(data.get("ws_failback_interval_s", 30.0)),
+        ws_latency_tolerance_ms = int(data.get("ws_latency_tolerance_ms", 20)),
+        clipboard_backends = tuple(data.get("clipboard_backends", ())),
+        clipboard_timeout_s = float(data.get("clipboard_timeout_s", 1.0)),
+        transcription_cache_size = int(data.get("transcription_cache_size", 32)),
+        transcription_revalidate = bool(data.get("transcription_revalidate", True)),
+        save_as_patch = bool(data.get("save_as_patch", False)),
+        startup_ws_wait_s = float(data.get("startup_ws_wait_s", 2.0)),
+        startup_profile = bool(data.get("startup_profile", False)),
+        multi_session = bool(data.get("multi_session", False)),
+        max_sessions = int(data.get("max_sessions", 64)),
+        session_users = tuple(data.get("session_users", ())),
+        log_level = data.get("log_level", "INFO"),
+        log_levels = dict(data.get("log_levels", {})),
+        log_file = data.get("log_file", ""),
+        log_max_field_chars = int(data.get("log_max_field_chars", 200)),
     )
\ No newline at end of file
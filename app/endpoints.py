@@ -0,0 +1,87 @@
+from __future__ import annotations
+import asyncio
+import time
+import websockets
+from .log import get_logger
+
+log = get_logger("endpoints")
+
+class EndpointSelector:
+    """Picks the WebSocket endpoint to use from an ordered list (first = preferred).
+
+    Candidates are probed in parallel (ping round trip) and the fastest healthy
+    one wins; the preferred endpoint wins ties within `tolerance_s`. A failed
+    endpoint sits out `cooldown_s` so the client fails over immediately instead
+    of retrying it.
+    """
+
+    def __init__(self, urls: list[str], probe_timeout_s: float = 2.0, cooldown_s: float = 10.0,
+                 tolerance_s: float = 0.02):
+        if not urls:
+            raise ValueError("At least one WebSocket URL is required")
+        self.urls = list(urls)
+        self.probe_timeout_s = probe_timeout_s
+        self.cooldown_s = cooldown_s
+        self.tolerance_s = tolerance_s
+        self.latency: dict[str, float] = {}  # last probe RTT per endpoint
+        self._down_until: dict[str, float] = {}
+
+    @property
+    def preferred(self) -> str:
+        return self.urls[0]
+
+    def available(self) -> list[str]:
+        now = time.monotonic()
+        return [u for u in self.urls if self._down_until.get(u, 0.0) <= now]
+
+    def mark_failed(self, url: str):
+        self._down_until[url] = time.monotonic() + self.cooldown_s
+        self.latency.pop(url, None)
+
+    def mark_ok(self, url: str):
+        self._down_until.pop(url, None)
+
+    async def probe(self, url: str) -> float | None:
+        """Ping round trip to `url` in seconds, or None if it can't be reached in time."""
+        try:
+            rtt = await asyncio.wait_for(self._ping(url), self.probe_timeout_s)
+        except Exception as e:
+            log.debug("Probe failed for %s: %s", url, e)
+            return None
+        self.latency[url] = rtt
+        return rtt
+
+    async def _ping(self, url: str) -> float:
+        async with websockets.connect(url, ping_interval=None, compression=None) as ws:
+            started = time.monotonic()
+            await (await ws.ping())
+            return time.monotonic() - started
+
+    async def choose(self) -> str | None:
+        """Best endpoint to connect to now, or None if none of them answered a probe."""
+        if len(self.urls) == 1:
+            return self.preferred  # nothing to choose from; backoff is the caller's job
+        # All cooling down: probe them anyway, the caller's backoff paces retries
+        candidates = self.available() or self.urls
+        results = await asyncio.gather(*(self.probe(u) for u in candidates))
+        healthy = {u: rtt for u, rtt in zip(candidates, results) if rtt is not None}
+        for url in candidates:
+            if url not in healthy:
+                self.mark_failed(url)
+        if not healthy:
+            return None
+        best = min(healthy, key=healthy.get)
+        for url in self.urls:  # preference order breaks near-ties
+            if url in healthy and healthy[url] - healthy[best] <= self.tolerance_s:
+                return url
+        return best
+
+    async def should_fail_back(self, current: str, current_rtt: float | None) -> bool:
+        """True when `current` is not the preferred endpoint and the preferred one is healthy again."""
+        if current == self.preferred:
+            return False
+        rtt = await self.probe(self.preferred)
+        if rtt is None:
+            return False
+        self.mark_ok(self.preferred)
+        return current_rtt is None or rtt - current_rtt <= self.tolerance_s
@@ -0,0 +1,79 @@
+from __future__ import annotations
+import asyncio
+import itertools
+import json
+import time
+from . import metrics
+from .log import get_logger
+
+log = get_logger("events")
+
+class Subscription:
+    """One subscriber's bounded buffer of pre-encoded events."""
+
+    def __init__(self, hub: "EventHub", buffer_size: int):
+        self.hub = hub
+        self.queue: asyncio.Queue[bytes | None] = asyncio.Queue(buffer_size)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> bytes:
+        frame = await self.queue.get()
+        if frame is None:
+            raise StopAsyncIteration
+        return frame
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+class EventHub:
+    """Fan-out of state changes (playback, connection, PDF results, ...) to many subscribers.
+
+    publish() never waits: each event is encoded once as an SSE frame and put
+    on every subscriber's bounded queue. A subscriber whose queue is full is
+    dropped (it reconnects and gets a fresh snapshot) so one slow display
+    can't hold up the others or grow memory.
+    """
+
+    def __init__(self, buffer_size: int = 64):
+        self.buffer_size = buffer_size
+        self.latest: dict[str, bytes] = {}  # last frame per event type, replayed to new subscribers
+        self._subscribers: set[Subscription] = set()
+        self._seq = itertools.count(1)
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_type: str, data: dict):
+        body = json.dumps({"type": event_type, "ts": time.time(), **data}, default=str)
+        frame = f"id: {next(self._seq)}\nevent: {event_type}\ndata: {body}\n\n".encode()
+        self.latest[event_type] = frame
+        for sub in list(self._subscribers):
+            try:
+                sub.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                log.warning("⚠️ Event subscriber too slow, dropping it")
+                metrics.EVENT_SUBSCRIBERS_DROPPED.inc()
+                self._drop(sub)
+
+    def subscribe(self) -> Subscription:
+        sub = Subscription(self, self.buffer_size)
+        for frame in list(self.latest.values())[-self.buffer_size:]:
+            sub.queue.put_nowait(frame)  # current state first
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        self._subscribers.discard(sub)
+
+    def close(self):
+        """End every subscription (shutdown), so streaming responses can finish."""
+        for sub in list(self._subscribers):
+            self._drop(sub)
+
+    def _drop(self, sub: Subscription):
+        self._subscribers.discard(sub)
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(None)  # ends the subscriber's iteration
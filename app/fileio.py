@@ -0,0 +1,59 @@
+from __future__ import annotations
+import asyncio
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+class FileIO:
+    """Bounded thread pool for filesystem work so disk (or network share) latency never blocks the loop."""
+
+    def __init__(self, max_workers: int = 4, chunk_size: int = 1024 * 1024, mmap_threshold: int = 8 * 1024 * 1024):
+        self.chunk_size = chunk_size
+        self.mmap_threshold = mmap_threshold
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fileio")
+
+    async def run(self, func, *args):
+        """Run a blocking callable on the I/O executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def exists(self, path: Path) -> bool:
+        return await self.run(path.exists)
+
+    async def glob(self, folder: Path, pattern: str) -> list[Path]:
+        return await self.run(lambda: list(folder.glob(pattern)))
+
+    async def remove(self, path: Path):
+        await self.run(os.remove, path)
+
+    async def mkdir(self, folder: Path):
+        await self.run(lambda: folder.mkdir(parents=True, exist_ok=True))
+
+    async def read_bytes(self, path: Path) -> bytearray:
+        return await self.run(self._read_file, path)
+
+    def _read_file(self, path: Path) -> bytearray:
+        """Read a file into a single preallocated buffer (mmap for large files, chunked readinto otherwise)."""
+        with open(path, "rb", buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return bytearray()
+            if size >= self.mmap_threshold:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return bytearray(mm)
+            buf = bytearray(size)
+            view = memoryview(buf)
+            read = 0
+            while read < size:
+                n = f.readinto(view[read:read + self.chunk_size])
+                if not n:
+                    break
+                read += n
+            view.release()
+            if read < size:
+                del buf[read:]
+            return buf
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
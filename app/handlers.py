@@ -1,15 +1,75 @@
+from __future__ import annotations
 import asyncio
-import time
 import os
+import time
+from collections import deque
 from pathlib import Path
-from .bus import Bus, Command
+from .bus import Bus, Command, BinaryPayload
+from .fileio import FileIO
+from .pdf_watcher import PDFWatcher, wait_until_complete
+from .coalesce import SeekCoalescer
+from .clipboard import Clipboard
+from .transcripts import TranscriptionCache
+from .textpatch import make_patch, sha256_text
+from . import metrics
+from .log import get_logger
+
+log = get_logger("handlers")
+
+# Seeks are folded together by SeekCoalescer; anything else flushes the pending seek first
+SEEK_COMMANDS = ("backward_audio", "forward_audio")
+
+# Command classes: commands in the same class run one at a time, in order;
+# different classes run concurrently (bounded by max_inflight)
+COMMAND_CLASSES = ("control", "audio", "transcription", "pdf")
+
+def _by_mtime(folder: Path, pattern: str) -> list[Path]:
+    """Files matching `pattern`, oldest first (name breaks ties); runs on the I/O executor."""
+    found = []
+    for path in folder.glob(pattern):
+        try:
+            found.append((os.stat(path).st_mtime_ns, path.name, path))
+        except OSError:
+            continue  # gone since the glob
+    return [path for _, _, path in sorted(found)]
 
 class Handlers:
-    def __init__(self, bus: Bus, pdf_dir: Path, pdf_wait_window_s: int, user_id_ref=None):
+    def __init__(self, bus: Bus, pdf_dir: Path, pdf_wait_window_s: int, user_id_ref=None,
+                 pdf_transfer_mode: str = "hex", pdf_chunk_size: int = 256 * 1024,
+                 io: FileIO | None = None, pdf_glob: str = "*.pdf", watcher: PDFWatcher | None = None,
+                 seek_coalesce_ms: int = 120, requester=None, max_inflight: int = 4,
+                 clipboard: Clipboard | None = None, transcripts: TranscriptionCache | None = None,
+                 revalidate_transcriptions: bool = True, save_as_patch: bool = False,
+                 pdf_drain_concurrency: int = 4, pdf_ready_stable_ms: int = 500,
+                 pdf_ready_timeout_s: float = 30.0, pdf_require_eof: bool = True):
         self.bus = bus
         self.pdf_dir = pdf_dir
         self.wait_s = pdf_wait_window_s
         self.user_id_ref = user_id_ref  # Reference to user_id from HTTPAPI
+        self.pdf_transfer_mode = pdf_transfer_mode
+        self.pdf_chunk_size = pdf_chunk_size
+        self.io = io or FileIO()  # all disk access goes through the I/O executor
+        self.pdf_glob = pdf_glob
+        self.watcher = watcher  # shared always-running index of pending PDFs
+        self.seeks = SeekCoalescer(self._emit_seek, seek_coalesce_ms)
+        self.requester = requester  # WSClient, for commands that await a server reply
+        self.clipboard = clipboard or Clipboard()
+        self.transcripts = transcripts if transcripts is not None else TranscriptionCache()
+        self.revalidate_transcriptions = revalidate_transcriptions  # refresh cache hits in the background
+        self._background: set[asyncio.Task] = set()
+        self.save_as_patch = save_as_patch  # send edits as a patch against the last received text
+        self.pdf_drain_concurrency = max(1, pdf_drain_concurrency)  # PDFs read ahead while draining
+        # When a file counts as fully written (see pdf_watcher.wait_until_complete)
+        self.ready_stable_ms = pdf_ready_stable_ms
+        self.ready_timeout_s = pdf_ready_timeout_s
+        self.require_eof = pdf_require_eof
+
+        # Dispatch table: command type -> (command class, handler(cmd))
+        self._routes: dict[str, tuple[str, object]] = {}
+        self._class_queues: dict[str, asyncio.Queue[Command]] = {c: asyncio.Queue() for c in COMMAND_CLASSES}
+        self._inflight = asyncio.Semaphore(max_inflight)
+        self._stop_event: asyncio.Event | None = None
+        self._register_defaults()
         
         # Audio state (minimal, server is source of truth)
         self.audio_state = {
@@ -25,178 +85,427 @@ class Handlers:
             payload['user_id'] = self.user_id_ref.user_id
         return payload
 
+    def register(self, command: str, command_class: str, handler):
+        """Route `command` to `handler(cmd)`, serialised with the rest of `command_class`."""
+        if command_class not in self._class_queues:
+            raise ValueError(f"Unknown command class: {command_class}")
+        self._routes[command] = (command_class, handler)
+
+    def _register_defaults(self):
+        self.register("stop", "control", self._stop)
+        self.register("play_pause", "audio", lambda cmd: self._play_pause())
+        self.register("backward_audio", "audio", lambda cmd: self._backward_audio())
+        self.register("forward_audio", "audio", lambda cmd: self._forward_audio())
+        self.register("previous_audio", "audio", lambda cmd: self._previous_audio())
+        self.register("next_audio", "audio", lambda cmd: self._next_audio())
+        self.register("keep_audio", "audio", lambda cmd: self.keep_audio())  # agregado
+        self.register("copy_transcription", "transcription", lambda cmd: self._copy_transcription())
+        self.register("save_edited_transcription", "transcription", lambda cmd: self._save_edited_transcription())
+        self.register("check_pdf_folder", "pdf", lambda cmd: self._check_pdf_window())
+        self.register("drain_pdf_folder", "pdf", lambda cmd: self._drain_pdf_folder())
+        self.register("pdf_detected", "pdf", lambda cmd: self._send_pdf(cmd.payload))
+
     async def run(self, stop_event: asyncio.Event):
-        while not stop_event.is_set():
-            try:
-                cmd = await asyncio.wait_for(self.bus.commands.get(), timeout=1.0)
-                await self._handle_command(cmd, stop_event)
+        self._stop_event = stop_event
+        workers = [
+            asyncio.create_task(self._worker(queue), name=f"handlers-{command_class}")
+            for command_class, queue in self._class_queues.items()
+        ]
+        try:
+            while not stop_event.is_set():
+                try:
+                    cmd = await asyncio.wait_for(self.bus.commands.get(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    continue
+                self.dispatch(cmd)
                 self.bus.commands.task_done()
-            except asyncio.TimeoutError:
-                continue
-            except Exception as e:
-                print(f"❌ Error handling command: {e}")
-
-    async def _handle_command(self, cmd: Command, stop_event: asyncio.Event):
-        """Handle incoming commands"""
-        print(f"🎯 COMMAND: {cmd.type}")
-        
-        if cmd.type == "stop":
-            # Set the stop event to trigger application shutdown
-            stop_event.set()
-        elif cmd.type == "check_pdf_folder":
-            await self._check_pdf_window()
-        elif cmd.type == "pdf_detected":
-            await self._send_pdf(cmd.payload)
-        elif cmd.type == "play_pause":
-            await self._play_pause()
-        elif cmd.type == "backward_audio":
-            await self._backward_audio()
-        elif cmd.type == "forward_audio":
-            await self._forward_audio()
-        elif cmd.type == "previous_audio":
-            await self._previous_audio()
-        elif cmd.type == "next_audio":
-            await self._next_audio()
-        elif cmd.type == "copy_transcription":
-            await self._copy_transcription()
-        elif cmd.type == "save_edited_transcription":
-            await self._save_edited_transcription()
-        # agregado
-        elif cmd.type == 'keep_audio':
-            await self.keep_audio()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def dispatch(self, cmd: Command):
+        """Queue a command on its class worker."""
+        route = self._routes.get(cmd.type)
+        if route is None:
+            log.warning("⚠️ Unknown command: %s", cmd.type)
+            return
+        self._class_queues[route[0]].put_nowait(cmd)
+
+    async def _worker(self, queue: asyncio.Queue[Command]):
+        while True:
+            cmd = await queue.get()
+            async with self._inflight:
+                token = metrics.command_origin.set(cmd.created)
+                try:
+                    with metrics.COMMAND_HANDLING.time(cmd.type):
+                        await self._handle_command(cmd)
+                    metrics.COMMANDS_TOTAL.inc(1, cmd.type)
+                    self.bus.events.publish("command", {"command": cmd.type})
+                except Exception as e:
+                    log.exception("❌ Error handling command: %s", e)
+                finally:
+                    metrics.command_origin.reset(token)
+            queue.task_done()
+
+    async def _handle_command(self, cmd: Command):
+        """Handle one command (called from its class worker)"""
+        log.info("🎯 COMMAND: %s", cmd.type)
+        command_class, handler = self._routes[cmd.type]
+        if command_class == "audio" and cmd.type not in SEEK_COMMANDS:
+            await self.seeks.flush()  # keep ordering with any pending seek
+        await handler(cmd)
+
+    async def _stop(self, cmd: Command):
+        # Set the stop event to trigger application shutdown
+        if self._stop_event is not None:
+            self._stop_event.set()
 
     async def _check_pdf_window(self):
         """Wait a short window for a file to appear; if none, still exit quickly."""
-        print("⏳ Waiting 5 seconds for PDF creation...")
-        deadline = asyncio.get_event_loop().time() + self.wait_s
-        while asyncio.get_event_loop().time() < deadline:
-            found = list(self.pdf_dir.glob("*.pdf"))
-            if found:
-                first_pdf = found[0]
-                await self._send_pdf(first_pdf)
-                print(f"✅ PDF folder check completed - sent 1 file: {first_pdf.name}")
-                return
-            await asyncio.sleep(0.25)
-        print("✅ PDF folder check completed - no files found")
+        log.info("⏳ Waiting %s seconds for PDF creation...", self.wait_s)
+        first_pdf = await self._wait_for_pdf()
+        if first_pdf is not None:
+            await self._send_pdf(first_pdf)
+            log.info("✅ PDF folder check completed - sent 1 file: %s", first_pdf.name)
+            return
+        log.info("✅ PDF folder check completed - no files found")
+        self.bus.events.publish("pdf", {"status": "none"})
 
         # Estas líneas fueron agregadas para subir el ctrl+9
-        await self.bus.outbound.put({
+        await self.bus.outbound.put(self._add_user_id({
             "command": "check_pdf_folder",
             "result": "no_files_found",
             "timestamp": time.time(),
-            "user_id": self.user_id_ref
-        })
+        }))
         ###
 
+    async def _wait_for_pdf(self) -> Path | None:
+        """Next PDF to submit: read from the watcher index, or poll the folder if there is no watcher."""
+        if self.watcher is not None:
+            path = await self.watcher.wait_for_pdf(self.wait_s)
+            if path is not None:
+                self.watcher.discard(path)  # claimed, don't hand it out twice
+            return path
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_s
+        while loop.time() < deadline:
+            for path in await self.io.run(_by_mtime, self.pdf_dir, self.pdf_glob):
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return None
+                if await self._wait_complete(path, remaining):
+                    return path
+            await asyncio.sleep(min(0.25, max(0.0, deadline - loop.time())))
+        return None
+
+    async def _wait_complete(self, path: Path, timeout_s: float | None = None) -> bool | None:
+        """wait_until_complete with the configured readiness settings, for at most `timeout_s`."""
+        timeout_s = self.ready_timeout_s if timeout_s is None else min(timeout_s, self.ready_timeout_s)
+        return await wait_until_complete(self.io, path, self.ready_stable_ms, timeout_s, self.require_eof)
+
     async def _send_pdf(self, path: Path):
         """Send PDF file via WebSocket"""
-        if not path.exists():
+        if not await self.io.exists(path):
             return
             
         try:
-            # Read PDF file
-            with open(path, 'rb') as f:
-                pdf_data = f.read()
-            
-            # Send via WebSocket
-            payload = {
+            message, size = await self._prepare_pdf(path)
+            await self._submit_pdf(path, message, size)
+        except Exception as e:
+            log.error("❌ Error processing PDF %s: %s", path, e)
+            self.bus.events.publish("pdf", {"status": "error", "file": path.name, "error": str(e)})
+
+    async def _prepare_pdf(self, path: Path) -> tuple[dict | BinaryPayload, int]:
+        """Read a PDF (off the event loop) into its submit_pdf message"""
+        pdf_data = await self.io.read_bytes(path)
+        if self.pdf_transfer_mode == "binary":
+            # JSON header frame + raw binary frames, no hex/JSON copies
+            header = {
                 'command': 'submit_pdf',
-                'pdf_data': pdf_data.hex(),  # Convert to hex string for JSON
+                'transfer_mode': 'binary',
                 'pdf_filename': path.name,
+                'pdf_size': len(pdf_data),
+                'chunk_size': self.pdf_chunk_size,
                 'timestamp': time.time()
             }
-            await self.bus.outbound.put(self._add_user_id(payload))
+            message = BinaryPayload(self._add_user_id(header), pdf_data, self.pdf_chunk_size)
+            header['chunks'] = message.chunk_count()
+            return message, len(pdf_data)
+        payload = {
+            'command': 'submit_pdf',
+            'transfer_mode': 'hex',
+            'pdf_data': pdf_data.hex(),  # Convert to hex string for JSON
+            'pdf_filename': path.name,
+            'timestamp': time.time()
+        }
+        return self._add_user_id(payload), len(pdf_data)
 
-            # Delete the PDF file after successful send
-            os.remove(path)
-            print(f"📄 PDF sent and deleted: {path.name}")
-            
+    async def _submit_pdf(self, path: Path, message, size: int, progress: dict | None = None):
+        """Queue a prepared PDF and delete the file once it is spooled"""
+        await self.bus.outbound.put(message)
+        await self.io.remove(path)
+        log.info("📄 PDF sent and deleted: %s", path.name)
+        self.bus.events.publish("pdf", {"status": "sent", "file": path.name, "size": size, **(progress or {})})
+
+    async def _drain_pdf_folder(self):
+        """Submit every pending PDF, oldest (mtime) first.
+
+        Up to pdf_drain_concurrency files are checked for completeness and
+        read ahead at once; they are queued strictly in order, so the server
+        sees the backlog in the order it was written. The next file is only
+        read once fewer than pdf_drain_concurrency uploads are waiting to be
+        sent, so a drain while offline holds at most twice that many PDFs in
+        memory instead of the whole folder.
+        """
+        found = await self.io.run(_by_mtime, self.pdf_dir, self.pdf_glob)
+        if not found:
+            log.info("✅ PDF drain completed - no files found")
+            self.bus.events.publish("pdf", {"status": "drained", "sent": 0, "failed": 0, "total": 0})
+            return
+        total = len(found)
+        log.info("📚 Draining %d PDFs (%d at a time)", total, self.pdf_drain_concurrency)
+        ready = set()  # already confirmed complete by the watcher
+        if self.watcher is not None:
+            ready = {path for path in found if path in self.watcher.pending}
+            for path in found:
+                self.watcher.discard(path)  # claimed, don't hand them out to check_pdf_folder too
+
+        ahead: deque[tuple[Path, asyncio.Task]] = deque()
+        results = []
+        try:
+            for path in found:
+                await self.bus.outbound.wait_pending_below("bulk", self.pdf_drain_concurrency)
+                ahead.append((path, asyncio.create_task(self._prepare_ready_pdf(path, path in ready))))
+                if len(ahead) >= self.pdf_drain_concurrency:
+                    results.append(await self._drain_one(*ahead.popleft(), len(results) + 1, total))
+            while ahead:
+                await self.bus.outbound.wait_pending_below("bulk", self.pdf_drain_concurrency)
+                results.append(await self._drain_one(*ahead.popleft(), len(results) + 1, total))
+        finally:
+            for _, task in ahead:
+                task.cancel()
+        sent = sum(results)
+        failed = total - sent
+        log.info("✅ PDF drain completed - sent %d of %d files (%d failed)", sent, total, failed)
+        self.bus.events.publish("pdf", {"status": "drained", "sent": sent, "failed": failed, "total": total})
+
+    async def _prepare_ready_pdf(self, path: Path, ready: bool):
+        if not ready and not await self._wait_complete(path):
+            raise RuntimeError("still being written or gone")
+        return await self._prepare_pdf(path)
+
+    async def _drain_one(self, path: Path, prepared: asyncio.Task, index: int, total: int) -> bool:
+        progress = {"index": index, "total": total}
+        try:
+            message, size = await prepared
+            await self._submit_pdf(path, message, size, progress)
+            log.info("📚 [%d/%d] %s", index, total, path.name)
+            return True
         except Exception as e:
-            print(f"❌ Error processing PDF {path}: {e}")
+            log.error("❌ [%d/%d] Error processing PDF %s: %s", index, total, path, e)
+            self.bus.events.publish("pdf", {"status": "error", "file": path.name, "error": str(e), **progress})
+            return False
+
+    def _publish_playback(self):
+        self.bus.events.publish("playback", dict(self.audio_state))
 
     async def _play_pause(self):
         """Toggle play/pause"""
         self.audio_state['is_playing'] = not self.audio_state['is_playing']
+        self._publish_playback()
         payload = {
             'command': 'play_pause',
-            'state': self.audio_state,
+            'state': dict(self.audio_state),  # snapshot, the dict keeps changing
             'timestamp': time.time()
         }
         await self.bus.outbound.put(self._add_user_id(payload))
 
     async def _backward_audio(self):
         """Skip backward 10 seconds"""
+        before = self.audio_state['position']
         self.audio_state['position'] = max(
             self.audio_state['position'] - 10,
             0
         )
-        payload = {
-            'command': 'backward_audio',
-            'state': self.audio_state,
-            'timestamp': time.time()
-        }
-        await self.bus.outbound.put(self._add_user_id(payload))
+        self._publish_playback()  # displays follow every press, the server gets the merged seek
+        await self.seeks.add(self.audio_state['position'] - before, 'backward')
 
     async def _forward_audio(self):
         """Skip forward 10 seconds"""
+        before = self.audio_state['position']
         self.audio_state['position'] = min(
             self.audio_state['position'] + 10,
             self.audio_state['duration']
         )
+        self._publish_playback()
+        await self.seeks.add(self.audio_state['position'] - before, 'forward')
+
+    async def _emit_seek(self, offset: int, count: int, direction: str):
+        """Send one message for a coalesced run of seeks"""
+        if offset:
+            direction = 'forward' if offset > 0 else 'backward'
         payload = {
-            'command': 'forward_audio',
-            'state': self.audio_state,
+            'command': f'{direction}_audio',
+            'state': dict(self.audio_state),
+            'seek_offset': offset,  # net seconds moved by the merged presses
+            'seek_count': count,
             'timestamp': time.time()
         }
         await self.bus.outbound.put(self._add_user_id(payload))
 
     async def _previous_audio(self):
         """Previous audio file"""
+        self._leave_audio_item()
         self.audio_state['current_file'] = f'audio_{int(time.time())-1}.mp3'
         self.audio_state['position'] = 0
+        self._publish_playback()
         payload = {
             'command': 'previous_audio',
-            'state': self.audio_state,
+            'state': dict(self.audio_state),
             'timestamp': time.time()
         }
         await self.bus.outbound.put(self._add_user_id(payload))
 
     async def _next_audio(self):
         """Next audio file"""
+        self._leave_audio_item()
         self.audio_state['current_file'] = f'audio_{int(time.time())}.mp3'
         self.audio_state['position'] = 0
+        self._publish_playback()
         payload = {
             'command': 'next_audio',
-            'state': self.audio_state,
+            'state': dict(self.audio_state),
             'timestamp': time.time()
         }
         await self.bus.outbound.put(self._add_user_id(payload))
 
+    def _leave_audio_item(self):
+        """Moving to another item: its cached transcription may change before we're back."""
+        self.transcripts.invalidate(self.audio_state['current_file'])
+
     async def _copy_transcription(self):
-        """Request transcription from server"""
-        payload = {
+        """Copy the transcription to the clipboard: from the cache, or requested from the server"""
+        key = self.audio_state['current_file']
+        cached = self.transcripts.get(key)
+        if cached is not None:
+            await self._copy_to_clipboard(cached)
+            if self.revalidate_transcriptions and self.requester is not None:
+                task = asyncio.create_task(self._revalidate_transcription(key, cached))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+            return
+
+        payload = self._add_user_id({
             'command': 'get_transcription',
             'timestamp': time.time()
-        }
-        await self.bus.outbound.put(self._add_user_id(payload))
+        })
+        if self.requester is None:
+            # Fire-and-forget: WSClient copies the unsolicited reply itself
+            await self.bus.outbound.put(payload)
+            return
+        try:
+            reply = await self.requester.request(payload)
+        except asyncio.TimeoutError:
+            log.warning("❌ No transcription received from server (timeout)")
+            return
+        transcription = reply.get('transcription', '')
+        if transcription:
+            self.transcripts.put(key, transcription)
+            await self._copy_to_clipboard(transcription, reply.get('_received_at'))
+
+    async def _revalidate_transcription(self, key: str, cached: str):
+        """Ask the server again after a cache hit; re-copy only if the text changed."""
+        payload = self._add_user_id({
+            'command': 'get_transcription',
+            'timestamp': time.time()
+        })
+        try:
+            reply = await self.requester.request(payload)
+        except asyncio.TimeoutError:
+            return
+        transcription = reply.get('transcription', '')
+        if not transcription or transcription == cached or key != self.audio_state['current_file']:
+            return
+        self.transcripts.put(key, transcription)
+        log.info("🔄 Transcription changed on the server")
+        await self._copy_to_clipboard(transcription, reply.get('_received_at'))
+
+    async def _copy_to_clipboard(self, transcription: str, received_at: float | None = None):
+        from .ws_client import get_transcription_highlight
+        if not await self.clipboard.copy(get_transcription_highlight(transcription)):
+            log.error("❌ Could not copy the transcription to the clipboard")
+            return
+        if received_at is not None:
+            metrics.RECEIVE_TO_CLIPBOARD.observe(time.monotonic() - received_at)
+        log.info("📋 Transcription copied to clipboard!")
+        self.bus.events.publish("transcription", {"status": "copied", "current_file": self.audio_state['current_file']})
 
     async def _save_edited_transcription(self):
         """Save edited transcription from clipboard"""
         try:
-            import pyperclip
-            clipboard_content = pyperclip.paste()
-            print("Copied content =>", clipboard_content)
-            payload = {
-                'command': 'save_edited_transcription',
-                'edited_transcription_content': clipboard_content
-            }
-            await self.bus.outbound.put(self._add_user_id(payload))
+            clipboard_content = await self.clipboard.paste()
+            if clipboard_content is None:
+                log.error("❌ Could not read the clipboard, nothing saved")
+                return
+            log.debug("Copied content => %s", clipboard_content)
+            key = self.audio_state['current_file']
+            mode = "patch"
+            if not (self.save_as_patch and await self._save_patch(key, clipboard_content)):
+                mode = "full"
+                payload = {
+                    'command': 'save_edited_transcription',
+                    'edited_transcription_content': clipboard_content
+                }
+                await self.bus.outbound.put(self._add_user_id(payload))
+            self.bus.events.publish("transcription", {"status": "saved", "mode": mode, "current_file": key})
+            self.transcripts.invalidate(key)  # server copy is changing
+            self.transcripts.last = (key, clipboard_content)  # baseline for the next save
         except Exception as e:
-            print(f"❌ Error saving edited transcription: {e}")
+            log.error("❌ Error saving edited transcription: %s", e)
+
+    async def _save_patch(self, key: str, text: str) -> bool:
+        """Save `text` as a patch against the last transcription of this item.
+
+        Returns False when the full text should be sent instead: no baseline,
+        the patch isn't much smaller, or the server didn't accept it (base hash
+        mismatch, error, no reply).
+        """
+        baseline = self.transcripts.last
+        if self.requester is None or baseline is None or baseline[0] != key:
+            return False
+        base = baseline[1]
+        # difflib is CPU-bound on long texts
+        ops = await asyncio.get_running_loop().run_in_executor(None, make_patch, base, text)
+        patch_chars = sum(len(op[2]) + 16 for op in ops)
+        if patch_chars * 2 > len(text):
+            return False
+        payload = self._add_user_id({
+            'command': 'save_edited_transcription',
+            'transcription_patch': {
+                'format': 'splice',  # [start, end, replacement], offsets into the base text
+                'base_sha256': sha256_text(base),
+                'ops': ops,
+            },
+            'edited_sha256': sha256_text(text),
+            'timestamp': time.time()
+        })
+        try:
+            reply = await self.requester.request(payload)
+        except asyncio.TimeoutError:
+            log.warning("⚠️ No reply to the patch save, sending the full text")
+            return False
+        if reply.get('status') != 'ok':
+            log.warning("⚠️ Patch save rejected (%s), sending the full text",
+                        reply.get('error') or reply.get('status'))
+            return False
+        log.info("💾 Saved as patch: %d change(s), %d chars instead of %d", len(ops), patch_chars, len(text))
+        return True
 
     # agregado
     async def keep_audio(self):
-        print("✅ Keep audio")
+        log.info("✅ Keep audio")
         payload = {
             'command': 'keep_audio',
             'timestamp': time.time()
@@ -1,12 +1,110 @@
+from __future__ import annotations
 import asyncio
+import time
 import keyboard
+from . import metrics
 from .bus import Bus, Command
+from .log import get_logger
+
+log = get_logger("hotkeys")
+
+# Outcome of a key event, the `result` label of app_hotkey_events_total
+INPUT_RESULTS = ("emitted", "repeat", "debounced", "rate_limited")
+
+# A combo with no key-down for this long is no longer held, even without a
+# key-up (OS auto-repeat keeps refreshing a key that really is held)
+_STALE_DOWN_S = 1.0
+
+class KeyInput:
+    """Turns key presses/releases into commands, on the event loop.
+
+    - A press emits its command once; OS auto-repeat while the key is down is
+      dropped before it gets here (see HotkeyAdapter).
+    - A press within `debounce_s` of the same key's release is contact bounce
+      or a double hit and is ignored.
+    - Hold commands (seeking) repeat on their own while the key is down: first
+      after `hold_delay_s`, then every `hold_repeat_s`, until the release. A
+      key-up can get lost (lock screen, UAC prompt), so each repeat also checks
+      `still_held(cmd)` and a hold never lasts longer than `hold_max_s`.
+    - `rate_limits` caps any command at N per second.
+    """
+
+    def __init__(self, emit, debounce_s: float = 0.03, hold_delay_s: float = 0.35, hold_repeat_s: float = 0.1,
+                 hold_commands=("backward_audio", "forward_audio"), rate_limits: dict | None = None,
+                 hold_max_s: float = 10.0, still_held=None):
+        self.emit = emit
+        self.debounce_s = debounce_s
+        self.hold_delay_s = hold_delay_s
+        self.hold_repeat_s = hold_repeat_s
+        self.hold_commands = set(hold_commands)
+        self.min_interval = {cmd: 1.0 / rate for cmd, rate in (rate_limits or {}).items() if rate > 0}
+        self.hold_max_s = hold_max_s
+        self.still_held = still_held
+        self._down: dict[str, float] = {}  # command -> when it was pressed
+        self._released: dict[str, float] = {}
+        self._emitted: dict[str, float] = {}
+        self._hold_timers: dict[str, asyncio.TimerHandle] = {}
+
+    def press(self, cmd: str):
+        now = time.monotonic()
+        if cmd in self._down:
+            metrics.HOTKEY_EVENTS.inc(1, "repeat")
+            return
+        if now - self._released.get(cmd, float("-inf")) < self.debounce_s:
+            metrics.HOTKEY_EVENTS.inc(1, "debounced")
+            return
+        self._down[cmd] = now
+        self._fire(cmd, now)
+        if cmd in self.hold_commands:
+            self._hold_timers[cmd] = asyncio.get_running_loop().call_later(self.hold_delay_s, self._hold, cmd)
+
+    def release(self, cmd: str):
+        if cmd not in self._down:
+            return  # its press was debounced
+        self.forget(cmd)
+        self._released[cmd] = time.monotonic()
+
+    def forget(self, cmd: str):
+        """Drop `cmd` as down without a release (its key-up was lost), so the next press isn't debounced."""
+        self._down.pop(cmd, None)
+        timer = self._hold_timers.pop(cmd, None)
+        if timer is not None:
+            timer.cancel()
+
+    def release_all(self):
+        for cmd in list(self._down):
+            self.release(cmd)
+
+    def _hold(self, cmd: str):
+        now = time.monotonic()
+        if now - self._down[cmd] > self.hold_max_s or (self.still_held is not None and not self.still_held(cmd)):
+            log.warning("⚠️ No release seen for %s, stopping its repeat", cmd)
+            self.release(cmd)
+            return
+        self._fire(cmd, now)
+        self._hold_timers[cmd] = asyncio.get_running_loop().call_later(self.hold_repeat_s, self._hold, cmd)
+
+    def _fire(self, cmd: str, now: float):
+        if now - self._emitted.get(cmd, float("-inf")) < self.min_interval.get(cmd, 0.0):
+            metrics.HOTKEY_EVENTS.inc(1, "rate_limited")
+            return
+        self._emitted[cmd] = now
+        metrics.HOTKEY_EVENTS.inc(1, "emitted")
+        self.emit(cmd)
 
 class HotkeyAdapter:
-    def __init__(self, bus: Bus, hotkey_stop: str = "", hotkey_check_pdf: str = ""):
+    def __init__(self, bus: Bus, hotkey_stop: str = "", hotkey_check_pdf: str = "", debounce_ms: int = 30,
+                 hold_delay_ms: int = 350, hold_repeat_ms: int = 100,
+                 hold_commands=("backward_audio", "forward_audio"), rate_limits: dict | None = None,
+                 hold_max_s: float = 10.0):
         self.bus = bus
         self._loop = None
         self._running = True
+        self.input = KeyInput(self._emit, debounce_ms / 1000, hold_delay_ms / 1000, hold_repeat_ms / 1000,
+                              hold_commands, rate_limits, hold_max_s, self._still_held)
+        self._held: dict[str, float] = {}  # combo -> last key-down, keyboard thread only
+        for result in INPUT_RESULTS:
+            metrics.HOTKEY_EVENTS.inc(0, result)  # every label exists before the keyboard thread counts
 
         # Map de teclas → comandos
         self.key_mappings = {
@@ -27,14 +125,16 @@ class HotkeyAdapter:
         """Inicia el listener global de hotkeys."""
         self._loop = asyncio.get_running_loop()
 
-        print("🎮 Hotkey listener started (keyboard lib)")
-        print("Atajos activos:")
+        log.info("🎮 Hotkey listener started (keyboard lib)")
+        log.info("Atajos activos:")
         for combo, cmd in self.key_mappings.items():
-            print(f"  {combo:<12} → {cmd}")
+            log.info("  %-12s → %s%s", combo, cmd, " (hold to repeat)" if cmd in self.input.hold_commands else "")
 
-        # Registrar los hotkeys globales
+        # Registrar los hotkeys globales: press via add_hotkey (handles the
+        # modifiers), release via the combo's last key
         for combo, cmd in self.key_mappings.items():
-            keyboard.add_hotkey(combo, self._trigger_command, args=(cmd,))
+            keyboard.add_hotkey(combo, self._on_press, args=(combo, cmd))
+            keyboard.on_release_key(combo.split('+')[-1], lambda _, c=combo, k=cmd: self._on_release(c, k))
 
         # Mantener tarea viva mientras la app corre
         try:
@@ -44,15 +144,42 @@ class HotkeyAdapter:
             pass
         finally:
             self.stop()
-            print("⭕️ Hotkey listener stopped")
+            log.info("⭕️ Hotkey listener stopped")
+
+    # keyboard thread: only a press or a release of a combo crosses to the loop,
+    # OS auto-repeat is dropped here
+
+    def _on_press(self, combo: str, cmd: str):
+        now = time.monotonic()
+        last = self._held.get(combo)
+        self._held[combo] = now
+        if last is not None and now - last < _STALE_DOWN_S:
+            metrics.HOTKEY_EVENTS.inc(1, "repeat")
+            return
+        if last is not None and self._loop:
+            self._loop.call_soon_threadsafe(self.input.forget, cmd)  # its key-up was lost
+        if self._loop:
+            self._loop.call_soon_threadsafe(self.input.press, cmd)
+
+    def _on_release(self, combo: str, cmd: str):
+        if self._held.pop(combo, None) is None:
+            return
+        if self._loop:
+            self._loop.call_soon_threadsafe(self.input.release, cmd)
+
+    def _still_held(self, cmd: str) -> bool:
+        """Whether a key bound to `cmd` is down, per the keyboard library's own state."""
+        return any(keyboard.is_pressed(combo) for combo, c in self.key_mappings.items() if c == cmd)
 
-    def _trigger_command(self, cmd: str):
-        """Envía el comando al bus desde el hook global."""
-        if self._loop and self.bus:
-            self._loop.call_soon_threadsafe(self.bus.commands.put_nowait, Command(cmd))
-            print(f"🟢 Command triggered: {cmd}")
+    def _emit(self, cmd: str):
+        """Envía el comando al bus (event loop)."""
+        if self.bus:
+            self.bus.commands.put_nowait(Command(cmd))
+            log.debug("🟢 Command triggered: %s", cmd)
 
     def stop(self):
         """Detiene todos los hotkeys registrados."""
-        keyboard.unhook_all_hotkeys()
-        self._running = False
\ No newline at end of file
+        keyboard.unhook_all()  # hotkeys and release hooks
+        if self._loop:
+            self.input.release_all()  # no seeking on after shutdown
+        self._running = False
@@ -1,41 +1,81 @@
+from __future__ import annotations
 import asyncio
-import json
-import os
+from typing import get_args
 from aiohttp import web
-from .bus import Bus, Command
+from .bus import Bus, Command, CommandType
+from .metrics import REGISTRY
+from .user import UserStore
+from .log import get_logger
+
+log = get_logger("http")
+
+# Origin of the web UI allowed to call the API from a browser
+CORS_ORIGIN = "http://150.1.6.144:8080"
+
+# Commands a session may queue through POST /command: not the internal ones
+# (they carry payloads), nor the clipboard ones (sessions have no clipboard)
+HTTP_COMMANDS = tuple(c for c in get_args(CommandType) if c not in (
+    "pdf_detected", "ws_send", "copy_transcription", "save_edited_transcription"))
 
 class HTTPAPI:
-    def __init__(self, bus: Bus, host: str, port: int):
+    """HTTP API. With `sessions` (multi-session mode) there is no single bus:
+    POST routes (/check_pdf, /command, /end_session) act on the session named
+    in the X-User-Id header, GET /events on the one named by the `user_id`
+    query parameter (or the header), and /set_user_id opens a session."""
+
+    def __init__(self, bus: Bus | None, host: str, port: int, users: UserStore | None = None,
+                 events_keepalive_s: float = 15.0, sessions=None):
         self.bus = bus
         self.host = host
         self.port = port
         self._runner = None
         self._site = None
-        self.user_id = None
-        self.user_data_file = "user_data.json"
-        self.load_user_id()
+        self.users = users or UserStore()
+        self.events_keepalive_s = events_keepalive_s
+        self.sessions = sessions
+
+    @property
+    def user_id(self) -> str | None:
+        return self.users.user_id
 
     async def start(self):
         app = web.Application()
         app.add_routes([
             web.get("/health", self.health),
+            web.get("/metrics", self.metrics),
+            web.get("/events", self.events),
             web.post("/check_pdf", self.check_pdf),
             web.get("/set_user_id", self.set_user_id_handler),
             web.options("/set_user_id", self.options_handler),
         ])
+        if self.sessions is not None:
+            # These act on a session named only in the X-User-Id header (see _header_session)
+            app.add_routes([
+                web.options("/check_pdf", self.options_handler),
+                web.post("/command", self.command),
+                web.options("/command", self.options_handler),
+                web.get("/sessions", self.list_sessions),
+                web.post("/end_session", self.end_session),
+                web.options("/end_session", self.options_handler),
+            ])
         self._runner = web.AppRunner(app)
         await self._runner.setup()
         self._site = web.TCPSite(self._runner, self.host, self.port)
         await self._site.start()
-        print(f"🌐 HTTP server started on http://{self.host}:{self.port}")
-        print("📡 Endpoint: GET /set_user_id?user_id=username")
-        print("🌐 CORS enabled for: http://150.1.6.144:8080")
+        log.info("🌐 HTTP server started on http://%s:%s", self.host, self.port)
+        log.info("📡 Endpoint: GET /set_user_id?user_id=username")
+        log.info("📡 Endpoint: GET /events (server-sent events)")
+        if self.sessions is not None:
+            log.info("📡 Endpoint: POST /command?command=play_pause, X-User-Id: username (multi-session)")
+        log.info("🌐 CORS enabled for: %s", CORS_ORIGIN)
         
         # Keep task alive
         while True:
             await asyncio.sleep(3600)
 
     async def stop(self):
+        if self.bus is not None:
+            self.bus.events.close()  # lets open /events streams finish (sessions close their own)
         if self._site:
             await self._site.stop()
         if self._runner:
@@ -44,32 +84,94 @@ class HTTPAPI:
     async def health(self, _):
         return web.json_response({"ok": True})
 
-    async def check_pdf(self, _):
-        await self.bus.commands.put(Command("check_pdf_folder"))
-        return web.json_response({"queued": True})
+    def _bus_for(self, request) -> Bus:
+        """The bus a request is for: the single bus, or the session of its user_id.
 
-    def load_user_id(self):
-        """Load user ID from JSON file"""
-        try:
-            if os.path.exists(self.user_data_file):
-                with open(self.user_data_file, 'r') as f:
-                    data = json.load(f)
-                    self.user_id = data.get('user_id')
-                    if self.user_id:
-                        print(f"👤 Loaded user ID: {self.user_id}")
-        except Exception as e:
-            print(f"❌ Error loading user ID: {e}")
+        Only GET may name the session in the query string (EventSource can't
+        set headers); anything else needs the X-User-Id header.
+        """
+        if self.sessions is None:
+            return self.bus
+        if request.method != "GET":
+            return self._header_session(request).bus
+        user_id = request.query.get("user_id") or request.headers.get("X-User-Id")
+        if not user_id:
+            raise web.HTTPBadRequest(text="user_id query parameter is required")
+        session = self.sessions.get(user_id)
+        if session is None:
+            raise web.HTTPNotFound(text=f"No session for user_id {user_id!r}")
+        return session.bus
 
-    def save_user_id(self, user_id):
-        """Save user ID to JSON file"""
+    async def metrics(self, _):
+        """Prometheus text exposition of the app metrics"""
+        return web.Response(body=REGISTRY.render().encode(),
+                            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    async def events(self, request):
+        """Server-sent events: current state first, then every change as it happens"""
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "Access-Control-Allow-Origin": CORS_ORIGIN,
+        })
+        bus = self._bus_for(request)
+        await response.prepare(request)
+        subscription = bus.events.subscribe()
+        frames = subscription.__aiter__()
         try:
-            self.user_id = user_id
-            data = {'user_id': user_id}
-            with open(self.user_data_file, 'w') as f:
-                json.dump(data, f)
-            print(f"👤 User ID saved: {user_id}")
-        except Exception as e:
-            print(f"❌ Error saving user ID: {e}")
+            while True:
+                try:
+                    frame = await asyncio.wait_for(frames.__anext__(), self.events_keepalive_s)
+                except asyncio.TimeoutError:
+                    frame = b": keepalive\n\n"  # comment line, keeps proxies from closing the stream
+                await response.write(frame)
+        except (StopAsyncIteration, ConnectionResetError):
+            pass  # dropped for falling behind, or the client went away
+        finally:
+            subscription.close()
+        return response
+
+    async def check_pdf(self, request):
+        drain = request.query.get("drain", "").lower() in ("1", "true", "yes")
+        await self._bus_for(request).commands.put(Command("drain_pdf_folder" if drain else "check_pdf_folder"))
+        response = web.json_response({"queued": True, "drain": drain})
+        response.headers['Access-Control-Allow-Origin'] = CORS_ORIGIN
+        return response
+
+    def _header_session(self, request):
+        """The session named in the X-User-Id header: a custom header makes browsers
+        preflight, so other web pages can't post to a session."""
+        user_id = request.headers.get("X-User-Id")
+        if not user_id:
+            raise web.HTTPBadRequest(text="X-User-Id header is required")
+        session = self.sessions.get(user_id)
+        if session is None:
+            raise web.HTTPNotFound(text=f"No session for user_id {user_id!r}")
+        return session
+
+    async def command(self, request):
+        """Queue a command on a session, e.g. POST /command?command=play_pause with X-User-Id"""
+        session = self._header_session(request)
+        name = request.query.get("command")
+        if name not in HTTP_COMMANDS:
+            response = web.json_response({"error": f"command must be one of {list(HTTP_COMMANDS)}"}, status=400)
+        else:
+            await session.bus.commands.put(Command(name))
+            response = web.json_response({"queued": True, "command": name})
+        response.headers['Access-Control-Allow-Origin'] = CORS_ORIGIN
+        return response
+
+    async def list_sessions(self, _):
+        return web.json_response({"sessions": [
+            {"user_id": user_id, "connected": session.ws.connected}
+            for user_id, session in self.sessions.sessions.items()
+        ]})
+
+    async def end_session(self, request):
+        session = self._header_session(request)
+        response = web.json_response({"closed": await self.sessions.close(session.user_id)})
+        response.headers['Access-Control-Allow-Origin'] = CORS_ORIGIN
+        return response
 
     async def set_user_id_handler(self, request):
         """HTTP handler for setting user ID"""
@@ -78,28 +180,31 @@ class HTTPAPI:
             
             if not user_id:
                 response = web.json_response({'error': 'user_id query parameter is required'}, status=400)
+            elif self.sessions is not None:
+                await self.sessions.open(user_id)
+                response = web.json_response({'success': True, 'user_id': user_id, 'session': True})
             else:
-                self.save_user_id(user_id)
+                self.users.save(user_id)
                 response = web.json_response({'success': True, 'user_id': user_id})
             
             # Add CORS headers
-            response.headers['Access-Control-Allow-Origin'] = 'http://150.1.6.144:8080'
+            response.headers['Access-Control-Allow-Origin'] = CORS_ORIGIN
             response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-            response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+            response.headers['Access-Control-Allow-Headers'] = 'Content-Type, X-User-Id'
             
             return response
             
         except Exception as e:
             response = web.json_response({'error': str(e)}, status=500)
-            response.headers['Access-Control-Allow-Origin'] = 'http://150.1.6.144:8080'
+            response.headers['Access-Control-Allow-Origin'] = CORS_ORIGIN
             return response
 
     async def options_handler(self, request):
         """Handle OPTIONS requests for CORS preflight"""
         response = web.Response()
-        response.headers['Access-Control-Allow-Origin'] = 'http://150.1.6.144:8080'
+        response.headers['Access-Control-Allow-Origin'] = CORS_ORIGIN
         response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-        response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, X-User-Id'
         return response
 
 
@@ -1,30 +1,89 @@
+from __future__ import annotations
 import asyncio
 import signal
 import contextlib
-from .bus import Bus
-from .ws_client import WSClient
-from .hotkeys import HotkeyAdapter
-from .http_api import HTTPAPI
-from .handlers import Handlers
+from pathlib import Path
+from .bus import Command
 from .config import Config
+from .fileio import FileIO
+from .codec import make_codec
+from .clipboard import Clipboard
+from .transcripts import TranscriptionCache
+from .sessions import SessionManager, make_bus, make_compressor, make_handlers, make_watcher, make_ws_client
+from .metrics import register_bus, register_sessions
+from .user import UserStore
+from .startup import StartupProfile
+from .log import get_logger, LogSystem
+# handlers/pdf_watcher, hotkeys (keyboard) and http_api (aiohttp) are imported
+# in run_app once the WebSocket connection is under way
 
-async def run_app(cfg: Config):
+log = get_logger("lifecycle")
+
+async def run_app(cfg: Config, profile: StartupProfile | None = None):
     """Main application lifecycle"""
-    bus = Bus()
+    profile = profile or StartupProfile()
+    profile.enabled = profile.enabled or cfg.startup_profile
+    logs = LogSystem(cfg.log_level, cfg.log_levels, cfg.log_file, cfg.log_max_field_chars)
+    logs.start()
+    if cfg.multi_session:
+        await run_sessions(cfg, profile)
+        logs.stop()
+        return
     stop_event = asyncio.Event()
+    with profile.phase("init spool"):
+        io = FileIO(cfg.io_workers, cfg.io_chunk_size)
+        bus = await make_bus(cfg, Path(cfg.spool_path).resolve() if cfg.spool_path else None)
+        register_bus(bus)
+        users = UserStore()
+        clipboard = Clipboard(cfg.clipboard_backends, timeout_s=cfg.clipboard_timeout_s)
+        transcripts = TranscriptionCache(cfg.transcription_cache_size)
+
+    # WebSocket first: the first hotkey press should find it connected
+    with profile.phase("init ws"):
+        ws = make_ws_client(cfg, bus, users, make_compressor(cfg), make_codec(cfg.ws_codec), clipboard, transcripts)
+    tasks = [asyncio.create_task(ws.start(), name="ws")]
+    ws_wait_until = asyncio.get_running_loop().time() + cfg.startup_ws_wait_s
 
-    # Initialize components
-    api = HTTPAPI(bus, cfg.http_host, cfg.http_port)
-    ws = WSClient(bus, cfg.ws_url, cfg.reconnect_base_s, cfg.reconnect_max_s, api)
-    hk = HotkeyAdapter(bus, "", "")  # F keys removed, using only Ctrl+numbers
-    handlers = Handlers(bus, cfg.pdf_dir, cfg.pdf_wait_window_s, api)
+    # Imported on a worker thread while the handshake is in flight, so the
+    # make_* factories below find them loaded
+    await profile.import_module("app.handlers")
+    await profile.import_module("app.pdf_watcher")
+    hotkeys_mod = await profile.import_module("app.hotkeys")
+    try:
+        await asyncio.wait_for(ws.wait_connected(), max(0.0, ws_wait_until - asyncio.get_running_loop().time()))
+        profile.mark("ws connected")
+    except asyncio.TimeoutError:
+        log.warning("⚠️ WebSocket not connected after %.1fs, starting anyway (commands are spooled)",
+                    cfg.startup_ws_wait_s)
 
-    # Create tasks
-    tasks = [
-        asyncio.create_task(ws.start(), name="ws"),
+    with profile.phase("init handlers + hotkeys"):
+        watcher = make_watcher(cfg, bus, io, cfg.pdf_dir)
+        handlers = make_handlers(cfg, bus, users, io, cfg.pdf_dir, watcher, ws, clipboard, transcripts)
+        hk = hotkeys_mod.HotkeyAdapter(  # F keys removed, using only Ctrl+numbers
+            bus,
+            debounce_ms=cfg.hotkey_debounce_ms,
+            hold_delay_ms=cfg.hotkey_hold_delay_ms,
+            hold_repeat_ms=cfg.hotkey_hold_repeat_ms,
+            hold_max_s=cfg.hotkey_hold_max_s,
+            hold_commands=cfg.hotkey_hold_commands,
+            rate_limits=cfg.hotkey_rate_limits,
+        )
+    tasks += [
+        asyncio.create_task(handlers.run(stop_event), name="handlers"),
         asyncio.create_task(hk.start(), name="hotkeys"),
+    ]
+    profile.mark("hotkeys ready")
+    if cfg.pdf_drain_on_startup:
+        bus.commands.put_nowait(Command("drain_pdf_folder"))  # e.g. a backlog left by an outage
+
+    # Not on the hotkey path: HTTP API and the folder watcher come last
+    http_api_mod = await profile.import_module("app.http_api")
+    with profile.phase("init http"):
+        api = http_api_mod.HTTPAPI(bus, cfg.http_host, cfg.http_port, users=users,
+                                   events_keepalive_s=cfg.events_keepalive_s)
+    tasks += [
         asyncio.create_task(api.start(), name="http"),
-        asyncio.create_task(handlers.run(stop_event), name="handlers"),
+        asyncio.create_task(watcher.start(), name="pdf_watcher"),
     ]
 
     # Setup signal handlers for graceful shutdown
@@ -34,17 +93,21 @@ async def run_app(cfg: Config):
                 sig, stop_event.set
             )
 
-    print("🎮 Audio Transcription Controller v2")
-    print("📁 PDF processing: Manual only (use Ctrl+9 to check)")
-    print("✅ All components started successfully")
+    log.info("🎮 Audio Transcription Controller v2")
+    log.info("📁 PDF processing: %s%s (Ctrl+5 to check)",
+             "backlog drained on startup" if cfg.pdf_drain_on_startup else "manual",
+             ", new files submitted automatically" if cfg.pdf_auto_submit else "")
+    log.info("✅ All components started successfully")
+    profile.report()
     
     # Wait for stop signal
     await stop_event.wait()
-    print("\n👋 Shutting down application...")
+    log.info("👋 Shutting down application...")
 
     # Graceful teardown
     await ws.stop()
     await api.stop()
+    watcher.stop()
     
     # Cancel all tasks
     for t in tasks:
@@ -54,6 +117,49 @@ async def run_app(cfg: Config):
     for t in tasks:
         with contextlib.suppress(asyncio.CancelledError):
             await t
-    
-    print("✅ Application stopped cleanly")
 
+    clipboard.stop()
+    bus.outbound.close()
+    io.shutdown()
+    log.info("✅ Application stopped cleanly")
+    logs.stop()
+
+
+async def run_sessions(cfg: Config, profile: StartupProfile):
+    """Multi-session lifecycle: one SessionManager instead of a single bus/ws/handlers.
+
+    There are no global hotkeys (they can't tell operators apart); each
+    operator drives their session through the HTTP API.
+    """
+    stop_event = asyncio.Event()
+    with profile.phase("init sessions"):
+        io = FileIO(cfg.io_workers, cfg.io_chunk_size)
+        sessions = SessionManager(cfg, io)
+        register_sessions(sessions)
+        for user_id in cfg.session_users:
+            await sessions.open(user_id)
+
+    http_api_mod = await profile.import_module("app.http_api")
+    with profile.phase("init http"):
+        api = http_api_mod.HTTPAPI(None, cfg.http_host, cfg.http_port,
+                                   events_keepalive_s=cfg.events_keepalive_s, sessions=sessions)
+    http_task = asyncio.create_task(api.start(), name="http")
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError):
+            asyncio.get_running_loop().add_signal_handler(sig, stop_event.set)
+
+    log.info("🎮 Audio Transcription Controller v2 (multi-session, %d started, max %d)",
+             len(sessions), cfg.max_sessions)
+    log.info("📡 Open a session with GET /set_user_id?user_id=username, then POST /command (X-User-Id header)")
+    profile.report()
+
+    await stop_event.wait()
+    log.info("👋 Shutting down %d sessions...", len(sessions))
+    await sessions.close_all()
+    await api.stop()
+    http_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await http_task
+    io.shutdown()
+    log.info("✅ Application stopped cleanly")
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+ROOT = "app"
+
+# Longest string field kept verbatim in a log record; payloads (hex PDFs,
+# transcriptions, clipboard contents) are cut down to this before they are queued
+DEFAULT_MAX_FIELD_CHARS = 200
+
+def get_logger(component: str) -> logging.Logger:
+    """Logger for one component, e.g. get_logger("ws") -> "app.ws"."""
+    return logging.getLogger(f"{ROOT}.{component}")
+
+def summarize(value, limit: int = DEFAULT_MAX_FIELD_CHARS, depth: int = 0):
+    """Cheap, bounded copy of a log argument: long strings are cut, bytes become
+    their length, containers are summarised a few levels deep."""
+    if isinstance(value, str):
+        if len(value) <= limit:
+            return value
+        return f"{value[:limit]}…(+{len(value) - limit} chars)"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, dict):
+        if depth >= 3:
+            return f"{{…{len(value)} keys}}"
+        return {k: summarize(v, limit, depth + 1) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if depth >= 3:
+            return f"[…{len(value)} items]"
+        items = [summarize(v, limit, depth + 1) for v in value[:20]]
+        if len(value) > 20:
+            items.append(f"…(+{len(value) - 20} items)")
+        return items
+    if hasattr(value, "header") and hasattr(value, "data"):  # BinaryPayload
+        return {"header": summarize(value.header, limit, depth + 1), "data": f"<{len(value.data)} bytes>"}
+    return value
+
+class _SummarizingQueueHandler(logging.handlers.QueueHandler):
+    """Queues records without formatting them; only argument summarising runs on the caller's thread."""
+
+    def __init__(self, q: queue.Queue, max_field_chars: int):
+        super().__init__(q)
+        self.max_field_chars = max_field_chars
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if not record.args and isinstance(record.msg, str) and len(record.msg) > self.max_field_chars * 10:
+            record.msg = summarize(record.msg, self.max_field_chars * 10)
+        if isinstance(record.args, dict):
+            record.args = summarize(record.args, self.max_field_chars)
+        elif record.args:
+            record.args = tuple(summarize(a, self.max_field_chars) for a in record.args)
+        return record
+
+class JSONLinesFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "component": record.name[len(ROOT) + 1:] if record.name.startswith(f"{ROOT}.") else record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class LogSystem:
+    """Queue-based logging: callers only enqueue, a listener thread formats and writes."""
+
+    def __init__(self, level: str = "INFO", component_levels: dict | None = None, log_file: str = "",
+                 max_field_chars: int = DEFAULT_MAX_FIELD_CHARS):
+        self._queue: queue.Queue = queue.Queue()
+        handlers: list[logging.Handler] = []
+
+        if sys.stderr is not None:  # None under pythonw
+            console = logging.StreamHandler()
+            console.setFormatter(logging.Formatter("%(asctime)s %(message)s", "%H:%M:%S"))
+            handlers.append(console)
+        if log_file:
+            sink = logging.FileHandler(log_file, encoding="utf-8")
+            sink.setFormatter(JSONLinesFormatter())
+            handlers.append(sink)
+
+        self._listener = logging.handlers.QueueListener(self._queue, *handlers, respect_handler_level=True)
+        root = logging.getLogger(ROOT)
+        root.handlers[:] = [_SummarizingQueueHandler(self._queue, max_field_chars)]
+        root.setLevel(level.upper())
+        root.propagate = False
+        for component, component_level in (component_levels or {}).items():
+            get_logger(component).setLevel(str(component_level).upper())
+
+    def start(self):
+        self._listener.start()
+
+    def stop(self):
+        """Flush everything queued so far and stop the listener thread."""
+        self._listener.stop()
@@ -0,0 +1,198 @@
+# Low-overhead in-process metrics, rendered in the Prometheus text format on /metrics
+from __future__ import annotations
+import bisect
+import time
+from contextvars import ContextVar
+
+# Monotonic time the command currently being handled was created (hotkey press,
+# HTTP call, ...). Set by Handlers, read by the spool to measure hotkey-to-wire latency.
+command_origin: ContextVar[float | None] = ContextVar("command_origin", default=None)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{v}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, *labels):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Gauge(_Metric):
+    """Gauge set explicitly, or computed at scrape time from `func`."""
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), func=None):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+        self.func = func  # () -> {labels tuple: value}
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        values = dict(self._values)
+        if self.func is not None:
+            values.update(self.func())
+        for labels, value in values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1  # values above the last bound only show up in +Inf
+        series[-2] += value
+        series[-1] += 1
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                label_str = _labels(self.labelnames + ("le",), labels + (bound,))
+                lines.append(f"{self.name}_bucket{label_str} {cumulative}")
+            label_str = _labels(self.labelnames + ("le",), labels + ("+Inf",))
+            lines.append(f"{self.name}_bucket{label_str} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=(), func=None) -> Gauge:
+        return self.register(Gauge(name, help, labelnames, func))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# Application metrics, shared by all components
+HOTKEY_TO_WIRE = REGISTRY.histogram(
+    "app_command_to_wire_seconds", "Time from command creation (hotkey/HTTP) to its frame being sent", ("lane",))
+COMMAND_HANDLING = REGISTRY.histogram(
+    "app_command_handling_seconds", "Time spent in Handlers per command", ("command",))
+HOTKEY_EVENTS = REGISTRY.counter(
+    "app_hotkey_events_total", "Hotkey presses by outcome (emitted or filtered before the bus)", ("result",))
+COMMANDS_TOTAL = REGISTRY.counter(
+    "app_commands_total", "Commands handled", ("command",))
+WS_RECONNECTS = REGISTRY.counter(
+    "app_ws_reconnects_total", "WebSocket connection attempts after a failure or disconnect")
+WS_DOWNTIME = REGISTRY.counter(
+    "app_ws_downtime_seconds_total", "Seconds spent without a WebSocket connection")
+WS_CONNECTED = REGISTRY.gauge(
+    "app_ws_connected", "1 while the WebSocket is connected")
+WS_RTT = REGISTRY.gauge(
+    "app_ws_rtt_seconds", "Smoothed WebSocket heartbeat round-trip time")
+MESSAGES_SENT = REGISTRY.counter(
+    "app_ws_messages_sent_total", "Messages sent over the WebSocket", ("lane",))
+WS_BATCH_MESSAGES = REGISTRY.histogram(
+    "app_ws_batch_messages", "Messages per frame sent from the interactive/transcription lanes",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+WS_BATCH_BYTES = REGISTRY.histogram(
+    "app_ws_batch_bytes", "Encoded size of batch frames (before compression)",
+    buckets=(256, 1024, 4096, 16384, 65536, 262144))
+PDF_BYTES = REGISTRY.counter(
+    "app_pdf_bytes_total", "PDF bytes uploaded")
+PDF_UPLOAD = REGISTRY.histogram(
+    "app_pdf_upload_seconds", "Time to put a PDF on the wire, from first to last frame")
+TRANSCRIPTION_CACHE = REGISTRY.counter(
+    "app_transcription_cache_total", "Transcription cache lookups", ("result",))
+EVENT_SUBSCRIBERS_DROPPED = REGISTRY.counter(
+    "app_event_subscribers_dropped_total", "Event stream subscribers dropped for falling behind")
+RECEIVE_TO_CLIPBOARD = REGISTRY.histogram(
+    "app_receive_to_clipboard_seconds", "Time from a transcription arriving to it being on the clipboard")
+
+def register_bus(bus):
+    """Expose queue depths, per-lane wait times and event subscribers of a Bus."""
+    REGISTRY.gauge("app_bus_commands_depth", "Commands waiting in Bus.commands",
+                   func=lambda: {(): bus.commands.qsize()})
+    REGISTRY.gauge("app_bus_outbound_depth", "Messages waiting per outbound lane", ("lane",),
+                   func=lambda: {(lane,): st["depth"] for lane, st in bus.outbound.stats().items()})
+    REGISTRY.gauge("app_bus_outbound_wait_max_seconds", "Longest queue wait per outbound lane", ("lane",),
+                   func=lambda: {(lane,): st["wait_max_s"] for lane, st in bus.outbound.stats().items()})
+    REGISTRY.gauge("app_event_subscribers", "Connected event stream subscribers",
+                   func=lambda: {(): len(bus.events)})
+
+def register_sessions(manager):
+    """Multi-session counterpart of register_bus: the same gauges, labelled by user."""
+    REGISTRY.gauge("app_sessions", "Active operator sessions", func=lambda: {(): len(manager)})
+    REGISTRY.gauge("app_bus_commands_depth", "Commands waiting in Bus.commands", ("user",),
+                   func=lambda: {(u,): s.bus.commands.qsize() for u, s in manager.sessions.items()})
+    REGISTRY.gauge("app_bus_outbound_depth", "Messages waiting per outbound lane", ("user", "lane"),
+                   func=lambda: {(u, lane): st["depth"] for u, s in manager.sessions.items()
+                                 for lane, st in s.bus.outbound.stats().items()})
+    REGISTRY.gauge("app_bus_outbound_wait_max_seconds", "Longest queue wait per outbound lane", ("user", "lane"),
+                   func=lambda: {(u, lane): st["wait_max_s"] for u, s in manager.sessions.items()
+                                 for lane, st in s.bus.outbound.stats().items()})
+    REGISTRY.gauge("app_event_subscribers", "Connected event stream subscribers", ("user",),
+                   func=lambda: {(u,): len(s.bus.events) for u, s in manager.sessions.items()})
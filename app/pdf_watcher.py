@@ -1,28 +1,156 @@
+from __future__ import annotations
 import asyncio
+import os
+import time
 from pathlib import Path
-from watchfiles import awatch
+from watchfiles import awatch, Change
 from .bus import Bus, Command
+from .fileio import FileIO
+from .log import get_logger
+
+log = get_logger("pdf_watcher")
+
+def _snapshot(path: Path, require_eof: bool) -> tuple[int, int, bool] | None:
+    """(size, mtime_ns, has %%EOF trailer) for a file, or None if it is gone."""
+    try:
+        st = os.stat(path)
+        has_eof = True
+        if require_eof:
+            with open(path, "rb") as f:
+                f.seek(max(st.st_size - 1024, 0))
+                has_eof = b"%%EOF" in f.read()
+        return st.st_size, st.st_mtime_ns, has_eof
+    except OSError:
+        return None
+
+async def wait_until_complete(io: FileIO, path: Path, stable_ms: int = 500, timeout_s: float = 30.0,
+                              require_eof: bool = True) -> bool | None:
+    """Wait until a file has stopped growing (size/mtime stable for `stable_ms`) and,
+    optionally, ends with a PDF `%%EOF` trailer. Returns False on timeout and None
+    if it vanished (e.g. claimed and submitted meanwhile)."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout_s
+    previous = None
+    while loop.time() < deadline:
+        current = await io.run(_snapshot, path, require_eof)
+        if current is None:
+            return None
+        size, _, has_eof = current
+        if current == previous and size > 0 and has_eof:
+            return True
+        previous = current
+        await asyncio.sleep(stable_ms / 1000)
+    return False
 
 class PDFWatcher:
-    def __init__(self, bus: Bus, folder: Path, pattern: str):
+    """Always-running folder watcher keeping an in-memory index of pending PDFs.
+
+    Files enter the index on notification but are only handed out once
+    wait_until_complete() has confirmed the writer is done with them.
+    """
+
+    def __init__(self, bus: Bus, folder: Path, pattern: str, io: FileIO | None = None,
+                 step_ms: int = 50, auto_submit: bool = False, ready_stable_ms: int = 500,
+                 ready_timeout_s: float = 30.0, require_eof: bool = True):
         self.bus = bus
         self.folder = folder
         self.pattern = pattern
+        self.io = io or FileIO()
+        self.step_ms = step_ms
+        self.auto_submit = auto_submit  # push pdf_detected for every new file
+        self.ready_stable_ms = ready_stable_ms
+        self.ready_timeout_s = ready_timeout_s
+        self.require_eof = require_eof
+        self.pending: dict[Path, float] = {}  # complete files: path -> monotonic time first seen
+        self._settling: dict[Path, asyncio.Task] = {}  # files still being written
+        self._arrived = asyncio.Event()
+        self._stop = asyncio.Event()
 
     async def start(self):
-        self.folder.mkdir(parents=True, exist_ok=True)
-        print(f"📁 PDF monitoring started: {self.folder}")
-        
+        await self.io.mkdir(self.folder)
+        log.info("📁 PDF monitoring started: %s", self.folder)
+
+        # Seed the index with files that landed while we were not running
+        for path in await self.io.glob(self.folder, self.pattern):
+            self._settle(path)
+
         try:
-            async for changes in awatch(self.folder):
+            async for changes in awatch(self.folder, step=self.step_ms, stop_event=self._stop):
                 # changes = set of (Change.added|modified|deleted, path)
                 for change_type, path_str in changes:
                     path = Path(path_str)
-                    if path.match(self.pattern) and change_type.name == 'added':
-                        print(f"📄 New PDF detected: {path.name}")
-                        await self.bus.commands.put(Command("pdf_detected", path))
+                    if not path.match(self.pattern):
+                        continue
+                    if change_type == Change.deleted:
+                        self.discard(path)
+                    else:
+                        if change_type == Change.added:
+                            log.info("📄 New PDF detected: %s", path.name)
+                        # Any write restarts the completeness check
+                        self.pending.pop(path, None)
+                        self._settle(path)
         except Exception as e:
-            print(f"❌ Error in PDF watcher: {e}")
+            log.error("❌ Error in PDF watcher: %s", e)
+        finally:
+            for task in self._settling.values():
+                task.cancel()
+
+    def stop(self):
+        self._stop.set()
+
+    def _settle(self, path: Path):
+        task = self._settling.pop(path, None)
+        if task is not None:
+            task.cancel()
+        self._settling[path] = asyncio.create_task(self._await_complete(path))
+
+    async def _await_complete(self, path: Path):
+        try:
+            complete = await wait_until_complete(
+                self.io, path, self.ready_stable_ms, self.ready_timeout_s, self.require_eof
+            )
+        finally:
+            if self._settling.get(path) is asyncio.current_task():
+                del self._settling[path]
+        if complete is None:
+            return  # gone, e.g. claimed and submitted by a drain meanwhile
+        if not complete:
+            log.warning("⚠️ PDF not complete after %ss, skipping for now: %s", self.ready_timeout_s, path.name)
+            return
+        self._add(path)
+        if self.auto_submit:
+            await self.bus.commands.put(Command("pdf_detected", path))
+
+    def _add(self, path: Path):
+        self.pending.setdefault(path, time.monotonic())
+        # Wake everyone waiting on the current event, then arm a fresh one
+        self._arrived.set()
+        self._arrived = asyncio.Event()
 
+    def discard(self, path: Path):
+        """Drop a file from the index once it has been claimed for submission."""
+        self.pending.pop(path, None)
+        task = self._settling.pop(path, None)
+        if task is not None:
+            task.cancel()
 
+    def oldest(self) -> Path | None:
+        if not self.pending:
+            return None
+        return min(self.pending, key=self.pending.get)
 
+    async def wait_for_pdf(self, timeout: float) -> Path | None:
+        """Return the oldest pending PDF, waiting up to `timeout` seconds for one to land."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            path = self.oldest()
+            if path is not None:
+                return path
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self._arrived.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return None
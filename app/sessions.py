@@ -0,0 +1,241 @@
+from __future__ import annotations
+import asyncio
+import contextlib
+import hashlib
+import re
+from pathlib import Path
+from .bus import Bus, Command
+from .config import Config
+from .fileio import FileIO
+from .compression import Compressor
+from .codec import Codec, make_codec
+from .clipboard import Clipboard, NoClipboard
+from .events import EventHub
+from .spool import OutboundSpool
+from .transcripts import TranscriptionCache
+from .ws_client import WSClient
+from .log import get_logger
+
+log = get_logger("sessions")
+
+# Components that exist once per operator. Single-user mode builds one set
+# in lifecycle.run_app; multi-session mode one per user_id (SessionManager).
+
+def make_compressor(cfg: Config) -> Compressor:
+    return Compressor(
+        mode=cfg.ws_compression,
+        min_bytes=cfg.ws_compression_min_bytes,
+        level=cfg.ws_compression_level,
+        window_bits=cfg.ws_deflate_window_bits,
+        dict_path=cfg.zstd_dict_path,
+        compress_binary=cfg.ws_compress_binary,
+    )
+
+async def make_bus(cfg: Config, spool_path: Path | None) -> Bus:
+    spool = OutboundSpool(spool_path, compact_bytes=cfg.spool_compact_bytes, fsync=cfg.spool_fsync)
+    await spool.load()
+    return Bus(spool, EventHub(cfg.events_buffer_size))
+
+def make_ws_client(cfg: Config, bus: Bus, user_ref, compressor: Compressor, codec: Codec,
+                   clipboard: Clipboard | NoClipboard, transcripts: TranscriptionCache) -> WSClient:
+    return WSClient(
+        bus,
+        list(cfg.ws_urls or [cfg.ws_url]),
+        base=cfg.reconnect_base_s,
+        max_delay=cfg.reconnect_max_s,
+        user_id_ref=user_ref,
+        compressor=compressor,
+        request_timeout_s=cfg.request_timeout_s,
+        heartbeat_interval_s=cfg.heartbeat_interval_s,
+        stall_rtt_s=cfg.stall_rtt_s,
+        stall_silence_s=cfg.stall_silence_s,
+        probe_timeout_s=cfg.ws_probe_timeout_s,
+        failover_cooldown_s=cfg.ws_failover_cooldown_s,
+        failback_interval_s=cfg.ws_failback_interval_s,
+        latency_tolerance_s=cfg.ws_latency_tolerance_ms / 1000,
+        codec=codec,
+        batch_max_items=cfg.ws_batch_max_items,
+        batch_max_bytes=cfg.ws_batch_max_bytes,
+        batch_max_ms=cfg.ws_batch_max_ms,
+        clipboard=clipboard,
+        transcripts=transcripts,
+    )
+
+def make_watcher(cfg: Config, bus: Bus, io: FileIO, pdf_dir: Path):
+    from .pdf_watcher import PDFWatcher
+    return PDFWatcher(
+        bus,
+        pdf_dir,
+        pattern=cfg.pdf_glob,
+        io=io,
+        step_ms=cfg.pdf_watch_step_ms,
+        auto_submit=cfg.pdf_auto_submit,
+        ready_stable_ms=cfg.pdf_ready_stable_ms,
+        ready_timeout_s=cfg.pdf_ready_timeout_s,
+        require_eof=cfg.pdf_require_eof,
+    )
+
+def make_handlers(cfg: Config, bus: Bus, user_ref, io: FileIO, pdf_dir: Path, watcher, ws: WSClient,
+                  clipboard: Clipboard | NoClipboard, transcripts: TranscriptionCache):
+    from .handlers import Handlers
+    return Handlers(
+        bus,
+        pdf_dir,
+        pdf_wait_window_s=cfg.pdf_wait_window_s,
+        user_id_ref=user_ref,
+        pdf_transfer_mode=cfg.pdf_transfer_mode,
+        pdf_chunk_size=cfg.pdf_chunk_size,
+        io=io,
+        pdf_glob=cfg.pdf_glob,
+        watcher=watcher,
+        seek_coalesce_ms=cfg.seek_coalesce_ms,
+        requester=ws,
+        max_inflight=cfg.max_inflight_commands,
+        clipboard=clipboard,
+        transcripts=transcripts,
+        revalidate_transcriptions=cfg.transcription_revalidate,
+        save_as_patch=cfg.save_as_patch,
+        pdf_drain_concurrency=cfg.pdf_drain_concurrency,
+        pdf_ready_stable_ms=cfg.pdf_ready_stable_ms,
+        pdf_ready_timeout_s=cfg.pdf_ready_timeout_s,
+        pdf_require_eof=cfg.pdf_require_eof,
+    )
+
+# user_ids used as they are in file names; "~" can't appear in one
+_PLAIN_NAME = re.compile(r"[a-z0-9][a-z0-9_.-]*")
+
+def _safe_name(user_id: str) -> str:
+    """File name for a user_id's spool and PDF folder, distinct for distinct ids.
+
+    Plain ids are used as they are. Anything else ("a b", "a/b", "Alice",
+    "..") is sanitized and tagged with a hash of the raw id, so ids that only
+    differ in unsafe characters (or case, on case-insensitive filesystems)
+    never share a spool file or PDF folder.
+    """
+    if _PLAIN_NAME.fullmatch(user_id):
+        return user_id
+    digest = hashlib.sha256(user_id.encode()).hexdigest()[:10]
+    return f"{re.sub(r'[^a-z0-9_.-]', '_', user_id.lower())}~{digest}"
+
+class SessionUser:
+    """user_id_ref of a session: always that session's operator."""
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+
+class Session:
+    """One operator's isolated pipeline: bus (own spool and event stream),
+    handler state and upstream WebSocket connection."""
+
+    def __init__(self, user_id: str, bus: Bus, ws: WSClient, handlers, watcher=None):
+        self.user_id = user_id
+        self.bus = bus
+        self.ws = ws
+        self.handlers = handlers
+        self.watcher = watcher
+        self.stop_event = asyncio.Event()  # set by the "stop" command or SessionManager.close()
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        name = f"session-{self.user_id}"
+        self._tasks = [
+            asyncio.create_task(self.ws.start(), name=f"{name}-ws"),
+            asyncio.create_task(self.handlers.run(self.stop_event), name=f"{name}-handlers"),
+        ]
+        if self.watcher is not None:
+            self._tasks.append(asyncio.create_task(self.watcher.start(), name=f"{name}-pdf_watcher"))
+
+    async def stop(self):
+        self.stop_event.set()
+        await self.ws.stop()
+        if self.watcher is not None:
+            self.watcher.stop()
+        self.bus.events.close()
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        await asyncio.get_running_loop().run_in_executor(None, self.bus.outbound.close)  # pending spool writes
+
+class SessionManager:
+    """Runs one Session per user_id in this process.
+
+    Sessions share the I/O executor, compressor/codec, logging and metrics.
+    Each gets its own spool file and PDF folder (suffixed with the user_id).
+    A PDF watcher is only started per session when pdf_auto_submit is on;
+    otherwise check_pdf scans the folder on demand. Sessions have no clipboard
+    (the process has one, operators don't): clipboard commands are refused.
+    """
+
+    def __init__(self, cfg: Config, io: FileIO):
+        self.cfg = cfg
+        self.io = io
+        self.clipboard = NoClipboard()
+        self.compressor = make_compressor(cfg)
+        self.codec = make_codec(cfg.ws_codec)
+        self.sessions: dict[str, Session] = {}
+        self._lock = asyncio.Lock()
+        self._reapers: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def get(self, user_id: str | None) -> Session | None:
+        return self.sessions.get(user_id) if user_id else None
+
+    async def open(self, user_id: str) -> Session:
+        """The running session for `user_id`, started if needed."""
+        async with self._lock:
+            session = self.sessions.get(user_id)
+            if session is not None:
+                return session
+            if len(self.sessions) >= self.cfg.max_sessions:
+                raise RuntimeError(f"Session limit reached ({self.cfg.max_sessions})")
+            session = await self._build(user_id)
+            self.sessions[user_id] = session
+            session.start()
+            if self.cfg.pdf_drain_on_startup:
+                session.bus.commands.put_nowait(Command("drain_pdf_folder"))
+        reaper = asyncio.create_task(self._reap(session))
+        self._reapers.add(reaper)
+        reaper.add_done_callback(self._reapers.discard)
+        log.info("👤 Session started for %s (%d active)", user_id, len(self.sessions))
+        return session
+
+    async def close(self, user_id: str) -> bool:
+        session = self.sessions.pop(user_id, None)
+        if session is None:
+            return False
+        await session.stop()
+        log.info("👋 Session closed for %s (%d active)", user_id, len(self.sessions))
+        return True
+
+    async def close_all(self):
+        for reaper in list(self._reapers):
+            reaper.cancel()
+        await asyncio.gather(*(self.close(user_id) for user_id in list(self.sessions)))
+
+    async def _reap(self, session: Session):
+        """Close a session once its own "stop" command has fired."""
+        await session.stop_event.wait()
+        if self.sessions.get(session.user_id) is session:
+            await self.close(session.user_id)
+
+    async def _build(self, user_id: str) -> Session:
+        cfg = self.cfg
+        name = _safe_name(user_id)
+        spool_path = None
+        if cfg.spool_path:
+            base = Path(cfg.spool_path).resolve()
+            spool_path = base.with_name(f"{base.stem}.{name}{base.suffix}")
+        pdf_dir = cfg.pdf_dir / name
+        await self.io.mkdir(pdf_dir)
+
+        user = SessionUser(user_id)
+        bus = await make_bus(cfg, spool_path)
+        transcripts = TranscriptionCache(cfg.transcription_cache_size)
+        ws = make_ws_client(cfg, bus, user, self.compressor, self.codec, self.clipboard, transcripts)
+        watcher = make_watcher(cfg, bus, self.io, pdf_dir) if cfg.pdf_auto_submit else None
+        handlers = make_handlers(cfg, bus, user, self.io, pdf_dir, watcher, ws, self.clipboard, transcripts)
+        return Session(user_id, bus, ws, handlers, watcher)
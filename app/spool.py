@@ -0,0 +1,307 @@
+from __future__ import annotations
+import asyncio
+import collections
+import json
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from .bus import BinaryPayload, Outbound, LANES, lane_for
+from .metrics import command_origin
+from .log import get_logger
+
+log = get_logger("spool")
+
+# Record layout: kind, seq, header length, body length, then header JSON and raw body
+_RECORD = struct.Struct(">BQII")
+_KIND_JSON = 1
+_KIND_BINARY = 2
+_KIND_ACK = 3
+_KIND_JSON_SPLIT = 4  # JSON header + large string values as raw body bytes
+_BIG_STRING = 64 * 1024
+
+@dataclass
+class SpoolEntry:
+    seq: int
+    payload: Outbound
+    size: int = 0  # bytes occupied in the spool file
+    lane: str = "interactive"
+    enqueued_at: float = field(default_factory=time.monotonic)
+    origin: float | None = None  # creation time of the command that produced it
+
+@dataclass
+class LaneStats:
+    enqueued: int = 0
+    dequeued: int = 0
+    wait_total_s: float = 0.0
+    wait_max_s: float = 0.0
+
+def _encode(kind: int, seq: int, header: bytes = b"", body=b"") -> list:
+    return [_RECORD.pack(kind, seq, len(header), len(body)), header, body]
+
+def _encode_entry(entry: SpoolEntry) -> list:
+    """Spool record for an entry; runs on the spool writer thread.
+
+    Large top-level strings (hex PDF data) are stored as raw body bytes, not
+    inside the JSON header: json.dumps on them holds the GIL for hundreds of
+    milliseconds, which would stall the event loop even from a thread.
+    """
+    payload = entry.payload
+    if isinstance(payload, BinaryPayload):
+        header = json.dumps({"header": payload.header, "chunk_size": payload.chunk_size}).encode()
+        return _encode(_KIND_BINARY, entry.seq, header, payload.data)
+    big = {k: v for k, v in payload.items() if isinstance(v, str) and len(v) >= _BIG_STRING}
+    if not big:
+        return _encode(_KIND_JSON, entry.seq, json.dumps(payload).encode())
+    small = {k: v for k, v in payload.items() if k not in big}
+    strings, body = [], []
+    for key, value in big.items():
+        # in slices, so the GIL is given up between them
+        parts = [value[i:i + _BIG_STRING].encode() for i in range(0, len(value), _BIG_STRING)]
+        strings.append([key, sum(len(p) for p in parts)])
+        body.extend(parts)
+    header = json.dumps({"payload": small, "strings": strings}).encode()
+    record = _RECORD.pack(_KIND_JSON_SPLIT, entry.seq, len(header), sum(n for _, n in strings))
+    return [record, header, *body]
+
+def _decode_entry(kind: int, seq: int, header: bytes, body: bytes) -> SpoolEntry:
+    data = json.loads(header)
+    if kind == _KIND_BINARY:
+        payload = BinaryPayload(data["header"], body, data["chunk_size"])
+    elif kind == _KIND_JSON_SPLIT:
+        payload = data["payload"]
+        offset = 0
+        for key, length in data["strings"]:
+            payload[key] = body[offset:offset + length].decode()
+            offset += length
+    else:
+        payload = data
+    return SpoolEntry(seq, payload, _RECORD.size + len(header) + len(body), lane_for(payload))
+
+class _SpoolFile:
+    """One append-only spool file, written by its own single thread.
+
+    Jobs run in submission order, so a compaction decided on the event loop
+    sees every append submitted before it (even those still being written)
+    and none submitted after it, which land in the new file.
+    """
+
+    def __init__(self, path: Path, fsync: bool):
+        self.path = path
+        self.fsync = fsync
+        self.live: dict[int, SpoolEntry] = {}  # submitted for writing and not acked yet
+        self.acked_bytes = 0  # dead bytes in the file, reclaimed by compaction
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"spool-{path.name}")
+
+    def _run(self, func, *args) -> asyncio.Future:
+        # Submits immediately: callers rely on no await between deciding and submitting
+        return asyncio.get_running_loop().run_in_executor(self._writer, func, *args)
+
+    async def append(self, entry: SpoolEntry):
+        self.live[entry.seq] = entry
+        entry.size = await self._run(self._append_entry, entry)
+
+    async def ack(self, entry: SpoolEntry, compact_bytes: int):
+        self.live.pop(entry.seq, None)
+        self.acked_bytes += entry.size
+        if not self.live:
+            self.acked_bytes = 0
+            await self._run(self._replace, [])
+        elif self.acked_bytes >= compact_bytes:
+            self.acked_bytes = 0
+            await self._run(self._replace, sorted(self.live.values(), key=lambda e: e.seq))
+        else:
+            await self._run(self._write, self.path, _encode(_KIND_ACK, entry.seq), "ab")
+
+    async def load(self) -> list[SpoolEntry]:
+        entries, size = await self._run(self._read)
+        self.live = {e.seq: e for e in entries}
+        self.acked_bytes = size - sum(e.size for e in entries)
+        return entries
+
+    def close(self):
+        self._writer.shutdown(wait=True)  # lets queued writes finish
+
+    # Writer thread
+
+    def _append_entry(self, entry: SpoolEntry) -> int:
+        return self._write(self.path, _encode_entry(entry), "ab")
+
+    def _write(self, path: Path, parts: list, mode: str) -> int:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, mode) as f:
+            for part in parts:
+                f.write(part)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        return sum(len(p) for p in parts)
+
+    def _replace(self, entries: list[SpoolEntry]) -> int:
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        written = self._write(tmp, [p for e in entries for p in _encode_entry(e)], "wb")
+        os.replace(tmp, self.path)
+        return written
+
+    def _read(self) -> tuple[list[SpoolEntry], int]:
+        if not self.path.exists():
+            return [], 0
+        data = memoryview(self.path.read_bytes())
+        entries: dict[int, SpoolEntry] = {}
+        offset = 0
+        while offset + _RECORD.size <= len(data):
+            kind, seq, header_len, body_len = _RECORD.unpack_from(data, offset)
+            start = offset + _RECORD.size
+            end = start + header_len + body_len
+            if end > len(data):
+                break  # torn write at the tail, drop it
+            if kind == _KIND_ACK:
+                entries.pop(seq, None)
+            else:
+                header = bytes(data[start:start + header_len])
+                body = bytes(data[start + header_len:end])
+                entries[seq] = _decode_entry(kind, seq, header, body)
+            offset = end
+        if offset < len(data):
+            os.truncate(self.path, offset)
+        return [entries[seq] for seq in sorted(entries)], offset
+
+class OutboundSpool:
+    """Append-only, disk-backed outbound queue.
+
+    Every message is written to the spool file before it becomes visible to
+    the sender and stays there until the sender acks it, so nothing is lost
+    across disconnects or restarts. Failed sends are put back at the head to
+    keep ordering. With path=None the spool is memory-only.
+
+    Messages are served by priority lane (see bus.LANES), FIFO within a lane.
+    Bulk uploads are spooled to a separate file (`<path>.bulk`) with its own
+    writer thread, so a small command never waits behind a large PDF write.
+    """
+
+    def __init__(self, path: Path | None = None, compact_bytes: int = 64 * 1024 * 1024, fsync: bool = False):
+        self.path = path
+        self.compact_bytes = compact_bytes
+        self.fsync = fsync
+        self._files: dict[str, _SpoolFile] = {}
+        if path is not None:
+            self._files = {
+                "main": _SpoolFile(path, fsync),
+                "bulk": _SpoolFile(path.with_name(path.name + ".bulk"), fsync),
+            }
+        self._lanes: dict[str, collections.deque[SpoolEntry]] = {lane: collections.deque() for lane in LANES}
+        self.lane_stats: dict[str, LaneStats] = {lane: LaneStats() for lane in LANES}
+        self._in_flight: dict[int, SpoolEntry] = {}
+        self._seq = 0
+        self._available = asyncio.Event()
+        self._acked = asyncio.Event()
+
+    # asyncio.Queue-style producer/consumer API
+
+    async def put(self, payload: Outbound):
+        self._seq += 1
+        entry = SpoolEntry(self._seq, payload, lane=lane_for(payload), origin=command_origin.get())
+        if self._files:
+            await self._files["bulk" if entry.lane == "bulk" else "main"].append(entry)
+        self._enqueue(entry)
+
+    async def get(self) -> SpoolEntry:
+        while True:
+            entry = self.get_nowait()
+            if entry is not None:
+                return entry
+            self._available.clear()
+            await self._available.wait()
+
+    def get_nowait(self, lanes: tuple[str, ...] = LANES) -> SpoolEntry | None:
+        """Next entry from the highest-priority non-empty lane among `lanes`, or None."""
+        for lane in lanes:
+            queue = self._lanes[lane]
+            if queue:
+                entry = queue.popleft()
+                stats = self.lane_stats[lane]
+                stats.dequeued += 1
+                waited = time.monotonic() - entry.enqueued_at
+                stats.wait_total_s += waited
+                stats.wait_max_s = max(stats.wait_max_s, waited)
+                self._in_flight[entry.seq] = entry
+                return entry
+        return None
+
+    def qsize(self, lane: str | None = None) -> int:
+        if lane is not None:
+            return len(self._lanes[lane])
+        return sum(len(q) for q in self._lanes.values())
+
+    def empty(self) -> bool:
+        return not self.qsize()
+
+    def pending(self, lane: str) -> int:
+        """Entries of `lane` not delivered yet: queued plus taken by the sender and not acked."""
+        return len(self._lanes[lane]) + sum(1 for e in self._in_flight.values() if e.lane == lane)
+
+    async def wait_pending_below(self, lane: str, limit: int):
+        """Wait until fewer than `limit` entries of `lane` are pending (see pending())."""
+        while self.pending(lane) >= limit:
+            self._acked.clear()
+            await self._acked.wait()
+
+    def stats(self) -> dict:
+        """Per-lane depth, throughput and queue wait counters."""
+        return {
+            lane: {
+                "depth": len(self._lanes[lane]),
+                "enqueued": st.enqueued,
+                "dequeued": st.dequeued,
+                "wait_avg_s": st.wait_total_s / st.dequeued if st.dequeued else 0.0,
+                "wait_max_s": st.wait_max_s,
+            }
+            for lane, st in self.lane_stats.items()
+        }
+
+    def _enqueue(self, entry: SpoolEntry):
+        self._lanes[entry.lane].append(entry)
+        self.lane_stats[entry.lane].enqueued += 1
+        self._available.set()
+
+    def task_done(self):
+        pass  # completion is signalled through ack()/retry()
+
+    # Delivery bookkeeping
+
+    def retry(self, entry: SpoolEntry):
+        """Put an unsent entry back at the head of the queue."""
+        if self._in_flight.pop(entry.seq, None) is None:
+            return
+        self._lanes[entry.lane].appendleft(entry)
+        self.lane_stats[entry.lane].dequeued -= 1
+        self._available.set()
+
+    async def ack(self, entry: SpoolEntry):
+        """Mark an entry as delivered and compact its spool file when worthwhile."""
+        if self._in_flight.pop(entry.seq, None) is None:
+            return
+        self._acked.set()
+        for spool_file in self._files.values():
+            if entry.seq in spool_file.live:  # restored entries may sit in either file
+                await spool_file.ack(entry, self.compact_bytes)
+                return
+
+    async def load(self):
+        """Restore unacknowledged messages left over from a previous run."""
+        if not self._files:
+            return
+        loaded = await asyncio.gather(*(f.load() for f in self._files.values()))
+        entries = sorted((e for batch in loaded for e in batch), key=lambda e: e.seq)
+        if entries:
+            self._seq = entries[-1].seq
+            for entry in entries:
+                self._enqueue(entry)
+            log.info("📦 Restored %d unsent message(s) from spool", len(entries))
+
+    def close(self):
+        """Finish pending writes and stop the writer threads."""
+        for spool_file in self._files.values():
+            spool_file.close()
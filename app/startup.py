@@ -0,0 +1,49 @@
+from __future__ import annotations
+import asyncio
+import contextlib
+import importlib
+import time
+from .log import get_logger
+
+log = get_logger("startup")
+
+class StartupProfile:
+    """Times each import and component init during startup.
+
+    Timings are always collected (it's a handful of perf_counter calls);
+    the report is only logged when `enabled`.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.phases: list[tuple[str, float]] = []  # (name, duration)
+        self.marks: list[tuple[str, float]] = []  # (name, time since start)
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def mark(self, name: str):
+        """Record a milestone, e.g. the WebSocket being connected."""
+        self.marks.append((name, time.perf_counter() - self.started))
+
+    async def import_module(self, name: str):
+        """Import a deferred module on a worker thread, so the event loop
+        (and an in-flight WebSocket handshake) keeps running meanwhile."""
+        with self.phase(f"import {name}"):
+            return await asyncio.get_running_loop().run_in_executor(None, importlib.import_module, name)
+
+    def report(self):
+        if not self.enabled:
+            return
+        total = time.perf_counter() - self.started
+        log.info("⏱️ Startup profile: %.1f ms total", total * 1000)
+        for name, duration in self.phases:
+            log.info("⏱️ %8.1f ms  %s", duration * 1000, name)
+        for name, at in self.marks:
+            log.info("⏱️ @%7.1f ms  %s", at * 1000, name)
@@ -0,0 +1,69 @@
+from __future__ import annotations
+import difflib
+import hashlib
+import re
+
+# Word-level diff: a token is a word plus the whitespace after it (a single
+# space as its own token would make difflib crawl on long lines)
+_TOKEN = re.compile(r"\S+\s*|\s+")
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def make_patch(base: str, new: str) -> list[list]:
+    """Splice ops [start, end, replacement] (character offsets into `base`) turning it into `new`.
+
+    Lines are diffed first and only changed line blocks are diffed word by word,
+    which keeps long documents with a few edits cheap.
+    """
+    a = base.splitlines(keepends=True)
+    b = new.splitlines(keepends=True)
+    ops = []
+    offset = 0  # start of line i1 in base
+    for tag, i1, i2, j1, j2 in _opcodes(a, b):
+        old_block = "".join(a[i1:i2])
+        if tag != "equal":
+            ops.extend(_word_ops(old_block, "".join(b[j1:j2]), offset))
+        offset += len(old_block)
+    return ops
+
+def _word_ops(base: str, new: str, offset: int) -> list[list]:
+    a = _TOKEN.findall(base)
+    b = _TOKEN.findall(new)
+    starts = [offset]
+    for token in a:
+        starts.append(starts[-1] + len(token))
+    return [
+        [starts[i1], starts[i2], "".join(b[j1:j2])]
+        for tag, i1, i2, j1, j2 in _opcodes(a, b)
+        if tag != "equal"
+    ]
+
+def _opcodes(a: list[str], b: list[str]) -> list[tuple]:
+    """difflib opcodes, with the common head and tail matched up front: an edit
+    is usually local, and difflib treats frequent items (blank lines, speaker
+    labels) as junk, which would otherwise blow a one-word fix up to the whole block."""
+    head = 0
+    limit = min(len(a), len(b))
+    while head < limit and a[head] == b[head]:
+        head += 1
+    tail = 0
+    while tail < limit - head and a[len(a) - 1 - tail] == b[len(b) - 1 - tail]:
+        tail += 1
+    matcher = difflib.SequenceMatcher(None, a[head:len(a) - tail], b[head:len(b) - tail])
+    ops = [("equal", 0, head, 0, head)] if head else []
+    ops += [(tag, i1 + head, i2 + head, j1 + head, j2 + head) for tag, i1, i2, j1, j2 in matcher.get_opcodes()]
+    if tail:
+        ops.append(("equal", len(a) - tail, len(a), len(b) - tail, len(b)))
+    return ops
+
+def apply_patch(base: str, ops: list[list]) -> str:
+    """Inverse of make_patch, for servers and for checking a patch before sending it."""
+    parts = []
+    position = 0
+    for start, end, replacement in ops:
+        parts.append(base[position:start])
+        parts.append(replacement)
+        position = end
+    parts.append(base[position:])
+    return "".join(parts)
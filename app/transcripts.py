@@ -0,0 +1,43 @@
+from __future__ import annotations
+from collections import OrderedDict
+from . import metrics
+
+class TranscriptionCache:
+    """Bounded LRU of transcriptions, keyed by audio item (audio_state['current_file']).
+
+    max_items=0 disables caching; `last` (the baseline for patch saves) is
+    kept either way.
+    """
+
+    def __init__(self, max_items: int = 32):
+        self.max_items = max_items
+        self.last: tuple[str | None, str] | None = None  # (key, text) last received or saved
+        self._items: OrderedDict[str, str] = OrderedDict()
+
+    def get(self, key: str) -> str | None:
+        text = self._items.get(key)
+        if text is None:
+            metrics.TRANSCRIPTION_CACHE.inc(1, "miss")
+            return None
+        self._items.move_to_end(key)
+        metrics.TRANSCRIPTION_CACHE.inc(1, "hit")
+        return text
+
+    def put(self, key: str | None, text: str):
+        self.last = (key, text)
+        if key is None or self.max_items <= 0:
+            return
+        self._items[key] = text
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def invalidate(self, key: str | None = None):
+        """Drop one item, or everything when `key` is None."""
+        if key is None:
+            self._items.clear()
+        else:
+            self._items.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._items)
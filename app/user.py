@@ -0,0 +1,41 @@
+from __future__ import annotations
+import json
+import os
+from .log import get_logger
+
+log = get_logger("user")
+
+class UserStore:
+    """The operator's user_id, persisted to a small JSON file.
+
+    Set through the HTTP API and read by the WebSocket client and handlers
+    (as their `user_id_ref`) when tagging outgoing messages.
+    """
+
+    def __init__(self, path: str = "user_data.json"):
+        self.path = path
+        self.user_id: str | None = None
+        self.load()
+
+    def load(self):
+        """Load user ID from JSON file"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                    self.user_id = data.get('user_id')
+                    if self.user_id:
+                        log.info("👤 Loaded user ID: %s", self.user_id)
+        except Exception as e:
+            log.error("❌ Error loading user ID: %s", e)
+
+    def save(self, user_id: str):
+        """Save user ID to JSON file"""
+        try:
+            self.user_id = user_id
+            data = {'user_id': user_id}
+            with open(self.path, 'w') as f:
+                json.dump(data, f)
+            log.info("👤 User ID saved: %s", user_id)
+        except Exception as e:
+            log.error("❌ Error saving user ID: %s", e)
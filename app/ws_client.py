@@ -1,20 +1,95 @@
+from __future__ import annotations
 import asyncio
-import json
 import contextlib
+import random
+import time
+import uuid
+from dataclasses import dataclass
 import websockets
-import pyperclip
 from websockets.client import WebSocketClientProtocol
-from .bus import Bus
+from .bus import Bus, BinaryPayload
+from .compression import Compressor
+from .codec import Codec
+from .clipboard import Clipboard
+from .transcripts import TranscriptionCache
+from .endpoints import EndpointSelector
+from . import metrics
+from .log import get_logger
+
+log = get_logger("ws")
+
+# Lanes whose messages may share a batch frame; bulk (PDFs) always goes out alone
+BATCH_LANES = ("interactive", "transcription")
+
+@dataclass
+class PendingRequest:
+    command: str
+    future: asyncio.Future
+    created_at: float
+    sent_at: float | None = None
+
+@dataclass
+class LatencyStats:
+    count: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+    last_s: float = 0.0
+    timeouts: int = 0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total_s += seconds
+        self.max_s = max(self.max_s, seconds)
+        self.last_s = seconds
 
 class WSClient:
-    def __init__(self, bus: Bus, url: str, base: float, max_delay: float, user_id_ref=None):
+    def __init__(self, bus: Bus, url: str | list[str], base: float, max_delay: float, user_id_ref=None,
+                 compressor: Compressor | None = None, request_timeout_s: float = 5.0,
+                 heartbeat_interval_s: float = 5.0, stall_rtt_s: float = 3.0, stall_silence_s: float = 15.0,
+                 probe_timeout_s: float = 2.0, failover_cooldown_s: float = 10.0,
+                 failback_interval_s: float = 30.0, latency_tolerance_s: float = 0.02,
+                 codec: Codec | None = None, batch_max_items: int = 1, batch_max_bytes: int = 64 * 1024,
+                 batch_max_ms: float = 5.0, clipboard: Clipboard | None = None,
+                 transcripts: TranscriptionCache | None = None):
         self.bus = bus
-        self.url = url
+        # One URL or several in order of preference; self.url is the one in use
+        urls = [url] if isinstance(url, str) else list(url)
+        self.endpoints = EndpointSelector(urls, probe_timeout_s, failover_cooldown_s, latency_tolerance_s)
+        self.url = self.endpoints.preferred
+        self.failback_interval_s = failback_interval_s  # 0 disables moving back to the preferred endpoint
         self.base = base
         self.max_delay = max_delay
         self.ws: WebSocketClientProtocol | None = None
         self._stop = asyncio.Event()
+        self._connected = asyncio.Event()
         self.user_id_ref = user_id_ref  # Reference to user_id from HTTPAPI
+        self.compressor = compressor or Compressor()
+        self.codec = codec or Codec()
+        self._text = Codec()  # JSON text frames, for messages that must not look like upload chunks
+        self.clipboard = clipboard or Clipboard()
+        self.transcripts = transcripts if transcripts is not None else TranscriptionCache()
+        # With a backlog, up to batch_max_items queued messages go out as one
+        # {"command": "batch"} frame (1 = off, the server must support batches)
+        self.batch_max_items = batch_max_items
+        self.batch_max_bytes = batch_max_bytes
+        self.batch_max_s = batch_max_ms / 1000
+        self.request_timeout_s = request_timeout_s
+        self._pending: dict[str, PendingRequest] = {}  # request_id -> waiting caller
+        self.latency: dict[str, LatencyStats] = {}  # per-command round-trip times
+        # Liveness: ping every heartbeat_interval_s, reconnect if a pong takes longer
+        # than stall_rtt_s or for stall_silence_s nothing arrives and nothing
+        # buffered goes out (a pong queued behind an upload that is still
+        # draining is late, not a stall)
+        self.heartbeat_interval_s = heartbeat_interval_s
+        self.stall_rtt_s = stall_rtt_s
+        self.stall_silence_s = stall_silence_s
+        self.rtt: float | None = None  # smoothed round-trip time in seconds, None until measured
+        self.last_rtt: float | None = None
+        self._last_heard = time.monotonic()
+        self._last_progress = self._last_heard  # outgoing data last moved
+        self._write_buffered = 0
+        self._progress_checked = self._last_progress
+        self._failing_back = False
 
     async def start(self):
         sender = asyncio.create_task(self._sender())
@@ -27,78 +102,369 @@ class WSClient:
 
     async def _run_reconnect_loop(self):
         delay = self.base
+        down_since = time.monotonic()
         while not self._stop.is_set():
+            url = await self.endpoints.choose()
+            if url is None:
+                log.error("❌ No WebSocket endpoint reachable, retrying in %.1fs", delay)
+                await asyncio.sleep(delay)
+                delay = min(self.max_delay, random.uniform(self.base, delay * 3))
+                continue
+            self.url = url
+            self._failing_back = False
             try:
-                print(f"🔌 Connecting to WebSocket: {self.url}")
-                async with websockets.connect(self.url) as ws:
+                log.info("🔌 Connecting to WebSocket: %s", url)
+                async with websockets.connect(
+                    url,
+                    extra_headers={**self.codec.headers(), **self.compressor.headers()},
+                    ping_interval=None,  # liveness is handled by _heartbeat
+                    **self.compressor.connect_kwargs(),
+                ) as ws:
                     self.ws = ws
                     delay = self.base  # reset backoff on success
-                    print("✅ WebSocket connected!")
-                    await self._receiver(ws)
+                    self.endpoints.mark_ok(url)
+                    log.info("✅ WebSocket connected!")
+                    metrics.WS_DOWNTIME.inc(time.monotonic() - down_since)
+                    metrics.WS_CONNECTED.set(1)
+                    self.bus.events.publish("connection", {"connected": True, "url": url})
+                    self._last_heard = self._last_progress = time.monotonic()
+                    self._write_buffered = 0
+                    self._progress_checked = self._last_progress
+                    self.rtt = None  # new endpoint, new baseline
+                    self._connected.set()  # sender replays the spool from here
+                    watchers = [asyncio.create_task(self._heartbeat(ws))]
+                    if url != self.endpoints.preferred and self.failback_interval_s > 0:
+                        watchers.append(asyncio.create_task(self._failback(ws)))
+                    try:
+                        await self._receiver(ws)
+                    finally:
+                        for task in watchers:
+                            task.cancel()
+                        self._connected.clear()
+                        self.ws = None
+                        metrics.WS_CONNECTED.set(0)
+                        self.bus.events.publish("connection", {"connected": False, "url": url})
+                        down_since = time.monotonic()
+                if not self._stop.is_set():
+                    metrics.WS_RECONNECTS.inc()
+                    if not self._failing_back:
+                        self.endpoints.mark_failed(url)  # dropped: try the others first
             except Exception as e:
-                print(f"❌ WebSocket connection error: {e}")
+                log.error("❌ WebSocket connection error (%s): %s", url, e)
+                metrics.WS_RECONNECTS.inc()
+                self.endpoints.mark_failed(url)
+                if self.endpoints.available():
+                    log.info("🔀 Failing over to the next endpoint")
+                    continue
                 await asyncio.sleep(delay)
-                delay = min(delay * 2, self.max_delay)
+                # Decorrelated jitter: spreads out reconnects of many clients
+                delay = min(self.max_delay, random.uniform(self.base, delay * 3))
+
+    async def _failback(self, ws: WebSocketClientProtocol):
+        """While on a fallback endpoint, periodically check whether the preferred one is back."""
+        while True:
+            await asyncio.sleep(self.failback_interval_s)
+            if await self.endpoints.should_fail_back(self.url, self.rtt):
+                log.info("↩️ Preferred endpoint %s is back, switching to it", self.endpoints.preferred)
+                self._failing_back = True
+                await ws.close()
+                return
+
+    async def _heartbeat(self, ws: WebSocketClientProtocol):
+        """Ping periodically, track RTT, and drop the connection when it stalls."""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval_s)
+            self._check_send_progress(ws)
+            idle_for = time.monotonic() - max(self._last_heard, self._last_progress)
+            if idle_for > self.stall_silence_s:
+                log.warning("⚠️ Nothing received or sent for %.1fs, reconnecting", idle_for)
+                break
+            sent = time.monotonic()
+            # ping() itself waits for the send buffer to drain, so it is under the deadline too
+            ping = asyncio.ensure_future(self._ping(ws))
+            delayed = False  # queued behind an upload, so not a round-trip time
+            try:
+                while not (await asyncio.wait({ping}, timeout=self.stall_rtt_s))[0]:
+                    if not self._check_send_progress(ws):
+                        raise asyncio.TimeoutError
+                    delayed = True
+                ping.result()
+            except asyncio.TimeoutError:
+                ping.cancel()
+                log.warning("⚠️ No pong within %.1fs and nothing sent, reconnecting", self.stall_rtt_s)
+                break
+            except websockets.exceptions.ConnectionClosed:
+                return
+            now = time.monotonic()
+            self._last_heard = now
+            if delayed:
+                log.debug("🐢 Pong delayed %.1fs behind buffered data", now - sent)
+                continue
+            self.last_rtt = now - sent
+            self.rtt = self.last_rtt if self.rtt is None else 0.8 * self.rtt + 0.2 * self.last_rtt
+            metrics.WS_RTT.set(self.rtt)
+        # Half-open socket: abort instead of a close handshake that would never complete
+        ws.transport.abort()
+
+    @staticmethod
+    async def _ping(ws: WebSocketClientProtocol):
+        pong = await ws.ping()
+        await pong
+
+    def _check_send_progress(self, ws: WebSocketClientProtocol) -> bool:
+        """Whether outgoing data moved since the last check: a send completed or the write buffer shrank."""
+        buffered = ws.transport.get_write_buffer_size()
+        if buffered < self._write_buffered:
+            self._last_progress = time.monotonic()
+        self._write_buffered = buffered
+        progressed = self._last_progress > self._progress_checked
+        self._progress_checked = self._last_progress
+        return progressed
+
+    async def _write(self, ws: WebSocketClientProtocol, frame):
+        """ws.send, noting the progress for the heartbeat (send returns once the buffer drained)."""
+        await ws.send(frame)
+        self._last_progress = time.monotonic()
 
     async def _receiver(self, ws: WebSocketClientProtocol):
         try:
             async for msg in ws:
+                self._last_heard = time.monotonic()
                 await self._handle_message(msg)
         except websockets.exceptions.ConnectionClosed:
-            print("🔌 WebSocket connection closed")
+            log.info("🔌 WebSocket connection closed")
         except Exception as e:
-            print(f"❌ Error in WebSocket receiver: {e}")
+            log.error("❌ Error in WebSocket receiver: %s", e)
+
+    async def request(self, payload: dict, timeout: float | None = None) -> dict:
+        """Send a payload tagged with a correlation ID and wait for the server's reply.
+
+        Raises asyncio.TimeoutError if no reply arrives within `timeout` seconds;
+        the entry is then dropped from the pending table.
+        """
+        timeout = self.request_timeout_s if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        request_id = uuid.uuid4().hex
+        pending = PendingRequest(payload.get('command', ''), loop.create_future(), time.monotonic())
+        self._pending[request_id] = pending
+        payload['request_id'] = request_id
+        try:
+            await self.bus.outbound.put(payload)
+            return await asyncio.wait_for(asyncio.shield(pending.future), timeout)
+        except asyncio.TimeoutError:
+            self.latency.setdefault(pending.command, LatencyStats()).timeouts += 1
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+
+    def _resolve_request(self, data: dict) -> bool:
+        """Complete the pending request this message answers. Replies without a
+        request_id fall back to the oldest pending request for the same command;
+        one with an unknown request_id (its caller timed out) answers nothing."""
+        request_id = data.get('request_id')
+        if request_id is None:
+            command = data.get('command')
+            request_id = next((rid for rid, p in self._pending.items() if p.command == command), None)
+        pending = self._pending.pop(request_id, None) if request_id else None
+        if pending is None or pending.future.done():
+            return False
+        now = time.monotonic()
+        self.latency.setdefault(pending.command, LatencyStats()).observe(now - (pending.sent_at or pending.created_at))
+        pending.future.set_result(data)
+        return True
 
     async def _handle_message(self, message):
         """Handle incoming WebSocket message"""
         try:
-            data = json.loads(message)
-            print(f"📨 Received: {data}")
-            
+            received_at = time.monotonic()
+            data = self.codec.decode(message)
+            data['_received_at'] = received_at  # for receive-to-clipboard latency
+            log.debug("📨 Received: %s", data)
+
+            # Replies to request() go back to whoever is awaiting them
+            if self._resolve_request(data):
+                return
+
             # Handle different message types
-            if data.get('type') == 'frontend_response' and data.get('command') == 'get_transcription':
+            if data.get('type') == 'transcription_changed':
+                # Edited elsewhere: cached copies of that item (or all, if unnamed) are stale
+                self.transcripts.invalidate(data.get('current_file'))
+            elif data.get('type') == 'frontend_response' and data.get('command') == 'get_transcription':
+                if data.get('request_id'):
+                    # Answer to a request() that already timed out: the operator may be on
+                    # another item by now, so neither copy nor cache it
+                    log.warning("⚠️ Dropping late transcription reply")
+                    return
                 transcription = data.get('transcription', '')
                 if transcription:
-                    # Copy to clipboard
-                    pyperclip.copy(get_transcription_highlight(transcription))
-                    print("📋 Transcription copied to clipboard!")
-        
+                    # Not cached: nothing ties an unsolicited reply to an item (the cache is
+                    # filled by Handlers from correlated replies only)
+                    # Copy to clipboard (on the clipboard thread; the receiver doesn't wait)
+                    copied = self.clipboard.copy_nowait(get_transcription_highlight(transcription))
+                    copied.add_done_callback(lambda f: _copied(f, received_at))
+
         except Exception as e:
-            print(f"❌ Error handling message: {e}")
+            log.error("❌ Error handling message: %s", e)
 
     # Estas líneas se modificaron
     async def _sender(self):
+        """Deliver spooled messages in order; anything not sent stays in the spool for the next connection."""
         while not self._stop.is_set():
             try:
-                payload = await asyncio.wait_for(self.bus.outbound.get(), timeout=1.0)
-
-                if self.ws is not None:
-                    # 🔧 Inject user_id dynamically
-                    user_id = None
-                    if self.user_id_ref:
-                        if hasattr(self.user_id_ref, "user_id"):
-                            user_id = self.user_id_ref.user_id
-                        else:
-                            user_id = str(self.user_id_ref)
-
-                    # Ensure payload is dict and JSON-safe
-                    if isinstance(payload, dict):
-                        if user_id:
-                            payload["user_id"] = user_id
-                    else:
-                        payload = {"command": str(payload), "user_id": user_id}
-
-                    await self.ws.send(json.dumps(payload))
-                    print(f"📤 Sent: {payload}")
-
+                await asyncio.wait_for(self._connected.wait(), timeout=1.0)
+                entry = await asyncio.wait_for(self.bus.outbound.get(), timeout=1.0)
             except asyncio.TimeoutError:
                 continue
+
+            ws = self.ws
+            if ws is None:
+                self.bus.outbound.retry(entry)
+                continue
+            batch = [entry]
+            try:
+                if self._can_batch(entry):
+                    await self._send_batch(ws, batch)
+                else:
+                    await self._send(ws, entry.payload)
+            except (websockets.exceptions.ConnectionClosed, OSError) as e:
+                # Link went away mid-send: keep the messages for the replay
+                log.warning("⚠️ Send failed, keeping message in spool: %s", e)
+                for queued in reversed(batch):
+                    self.bus.outbound.retry(queued)
+                continue
             except Exception as e:
-                print(f"❌ Error sending message: {e}")
-            finally:
-                with contextlib.suppress(ValueError):
-                    self.bus.outbound.task_done()
-            ###
+                log.error("❌ Error sending message, dropping it: %s", e)
+                for queued in batch:
+                    await self.bus.outbound.ack(queued)
+                continue
+            if entry.lane in BATCH_LANES:
+                metrics.WS_BATCH_MESSAGES.observe(len(batch))
+            for queued in batch:
+                self._record_sent(queued)
+            for queued in batch:
+                await self.bus.outbound.ack(queued)
+
+    def _can_batch(self, entry) -> bool:
+        """Batch only when enabled, for small-message lanes, and when more is already waiting."""
+        return (self.batch_max_items > 1 and entry.lane in BATCH_LANES
+                and any(self.bus.outbound.qsize(lane) for lane in BATCH_LANES))
+
+    async def _send_batch(self, ws: WebSocketClientProtocol, batch: list):
+        """Send batch[0] plus whatever is queued behind it, within the item/byte/time
+        budget, as one batch frame. Drained entries are appended to `batch`."""
+        started = time.perf_counter()
+        payloads = [self._stamp(batch[0].payload)]
+        frames = [self.codec.encode(payloads[0])]
+        size = len(frames[0])
+        while (len(batch) < self.batch_max_items and size < self.batch_max_bytes
+               and time.perf_counter() - started < self.batch_max_s):
+            entry = self.bus.outbound.get_nowait(BATCH_LANES)
+            if entry is None:
+                break
+            batch.append(entry)
+            payloads.append(self._stamp(entry.payload))
+            frames.append(self.codec.encode(payloads[-1]))
+            size += len(frames[-1])
+
+        if len(frames) == 1:
+            await self._write(ws, await self.compressor.encode(frames[0]))
+        else:
+            await self._write(ws, await self.compressor.encode(self.codec.batch(frames)))
+            metrics.WS_BATCH_BYTES.observe(size)
+        now = time.monotonic()
+        for payload in payloads:
+            pending = self._pending.get(payload.get("request_id"))
+            if pending is not None:
+                pending.sent_at = now
+        log.debug("📤 Sent batch of %d message(s), %d bytes", len(batch), size)
+
+    async def _delivered(self, entry):
+        """Record a sent spool entry, then ack it."""
+        self._record_sent(entry)
+        await self.bus.outbound.ack(entry)
+
+    def _record_sent(self, entry):
+        """Count a sent entry by lane and observe its command-to-wire latency. Call it
+        as soon as send() returns: the ack that follows is a spool write."""
+        metrics.MESSAGES_SENT.inc(1, entry.lane)
+        if entry.origin is not None:
+            metrics.HOTKEY_TO_WIRE.observe(time.monotonic() - entry.origin, entry.lane)
+
+    def _user_id(self) -> str | None:
+        if self.user_id_ref:
+            if hasattr(self.user_id_ref, "user_id"):
+                return self.user_id_ref.user_id
+            return str(self.user_id_ref)
+        return None
+
+    def _stamp(self, payload) -> dict:
+        """The payload as a dict with the current user_id injected."""
+        user_id = self._user_id()
+        # Ensure payload is dict and JSON-safe
+        if isinstance(payload, dict):
+            if user_id:
+                payload["user_id"] = user_id
+            return payload
+        return {"command": str(payload), "user_id": user_id}
+
+    async def _send(self, ws: WebSocketClientProtocol, payload, text_only: bool = False):
+        if isinstance(payload, BinaryPayload):
+            # 🔧 Inject user_id dynamically
+            user_id = self._user_id()
+            if user_id:
+                payload.header["user_id"] = user_id
+            started = time.perf_counter()
+            await self._send_binary(ws, payload)
+            metrics.PDF_BYTES.inc(len(payload.data))
+            metrics.PDF_UPLOAD.observe(time.perf_counter() - started)
+            return
+
+        payload = self._stamp(payload)
+        started = time.perf_counter()
+        if text_only:
+            await self._write(ws, self._text.encode(payload))
+        else:
+            await self._write(ws, await self.compressor.encode(self.codec.encode(payload)))
+        if payload.get("command") == "submit_pdf" and "pdf_data" in payload:
+            metrics.PDF_BYTES.inc(len(payload["pdf_data"]) // 2)  # hex encoded
+            metrics.PDF_UPLOAD.observe(time.perf_counter() - started)
+        pending = self._pending.get(payload.get("request_id"))
+        if pending is not None:
+            pending.sent_at = time.monotonic()
+        log.debug("📤 Sent: %s", payload)
+    ###
+
+    async def _send_binary(self, ws: WebSocketClientProtocol, payload: BinaryPayload):
+        """Send the JSON header frame, then the body as memoryview-sliced binary frames.
+
+        Until the last chunk every binary frame is taken as upload data, so the
+        header and the messages interleaved between chunks always go as JSON
+        text, whatever the codec or compression.
+        """
+        await self._write(ws, self._text.encode(payload.header))
+        for chunk in payload.chunks():
+            await self._write(ws, chunk)
+            # Let audio commands overtake the upload between chunks
+            await self._send_interactive(ws)
+        log.debug("📤 Sent: %s (%d bytes in %d binary frames)",
+                  payload.header.get('command'), len(payload.data), payload.chunk_count())
+
+    async def _send_interactive(self, ws: WebSocketClientProtocol):
+        """Send everything waiting in the interactive lane right now, as text frames (mid-upload)."""
+        while (entry := self.bus.outbound.get_nowait(("interactive",))) is not None:
+            try:
+                await self._send(ws, entry.payload, text_only=True)
+            except Exception:
+                self.bus.outbound.retry(entry)
+                raise
+            await self._delivered(entry)
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    async def wait_connected(self):
+        await self._connected.wait()
 
     async def stop(self):
         self._stop.set()
@@ -106,6 +472,11 @@ class WSClient:
             with contextlib.suppress(Exception):
                 await self.ws.close()
 
+def _copied(future: asyncio.Future, received_at: float):
+    if not future.cancelled() and future.result():
+        metrics.RECEIVE_TO_CLIPBOARD.observe(time.monotonic() - received_at)
+        log.info("📋 Transcription copied to clipboard!")
+
 #agregado
 def get_transcription_highlight(text):
     border = "=" * 50
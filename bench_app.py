@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the controller.
+Starts a local WebSocket stand-in server and drives the real Bus, Handlers
+and WSClient in-process; no server, hotkeys or clipboard needed.
+
+    python bench_app.py --output bench_results.json
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import websockets
+
+from app.bus import Bus, Command
+from app.handlers import Handlers
+from app.ws_client import WSClient
+
+try:
+    import resource  # not available on Windows
+except ImportError:
+    resource = None
+
+class StandInServer:
+    """Local server that timestamps every frame and answers requests like the real one."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.frames: list[tuple[float, str | int]] = []  # (arrival time, command or binary length)
+        self.binary_bytes = 0
+        self._server = None
+        self._arrival = asyncio.Event()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await websockets.serve(self._handle, self.host, self.port, max_size=None)
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, ws):
+        async for message in ws:
+            now = time.monotonic()
+            if isinstance(message, bytes):
+                self.binary_bytes += len(message)
+                self.frames.append((now, len(message)))
+            else:
+                data = json.loads(message)
+                messages = data["messages"] if data.get("command") == "batch" else [data]
+                for data in messages:
+                    self.frames.append((now, data.get("command", "")))
+                    if "request_id" in data:
+                        await ws.send(json.dumps({
+                            "type": "frontend_response",
+                            "command": data.get("command"),
+                            "request_id": data["request_id"],
+                            "transcription": "bench",
+                        }))
+            self._arrival.set()
+
+    async def wait_for(self, predicate, timeout: float = 60.0):
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            self._arrival.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("stand-in server did not receive the expected frames")
+            try:
+                await asyncio.wait_for(self._arrival.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+def summary_ms(values: list[float]) -> dict:
+    return {
+        "n": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(max(values) * 1000, 3) if values else 0.0,
+    }
+
+class Harness:
+    def __init__(self, server: StandInServer, pdf_dir: Path, transfer_mode: str = "hex"):
+        self.bus = Bus()
+        self.stop_event = asyncio.Event()
+        self.ws = WSClient(self.bus, server.url, 0.05, 1.0)
+        self.handlers = Handlers(self.bus, pdf_dir, 1, pdf_transfer_mode=transfer_mode,
+                                 seek_coalesce_ms=0, requester=self.ws)
+        self.tasks: list[asyncio.Task] = []
+
+    async def __aenter__(self):
+        self.tasks = [
+            asyncio.create_task(self.ws.start()),
+            asyncio.create_task(self.handlers.run(self.stop_event)),
+        ]
+        await asyncio.wait_for(self.ws.wait_connected(), 10)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.stop_event.set()
+        await self.ws.stop()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+async def bench_command_latency(server: StandInServer, pdf_dir: Path, count: int) -> dict:
+    """Command creation (as a hotkey would) to arrival at the server."""
+    async with Harness(server, pdf_dir) as h:
+        server.frames.clear()
+        created = []
+        for _ in range(count):
+            cmd = Command("play_pause")
+            created.append(cmd.created)
+            await h.bus.commands.put(cmd)
+            await asyncio.sleep(0.002)
+        await server.wait_for(lambda: sum(1 for _, c in server.frames if c == "play_pause") >= count)
+    arrivals = [t for t, c in server.frames if c == "play_pause"]
+    return summary_ms([a - c for a, c in zip(arrivals, created)])
+
+async def bench_pdf_throughput(server: StandInServer, pdf_dir: Path, sizes_mb: list[int], mode: str) -> list[dict]:
+    results = []
+    async with Harness(server, pdf_dir, mode) as h:
+        for size_mb in sizes_mb:
+            path = pdf_dir / f"bench_{size_mb}mb.pdf"
+            path.write_bytes(os.urandom(size_mb * 1024 * 1024) + b"\n%%EOF\n")
+            size = path.stat().st_size
+            server.frames.clear()
+            server.binary_bytes = 0
+            tracemalloc.start()
+            started = time.monotonic()
+            await h.handlers._send_pdf(path)
+            if mode == "binary":
+                await server.wait_for(lambda: server.binary_bytes >= size)
+            else:
+                await server.wait_for(lambda: any(c == "submit_pdf" for _, c in server.frames))
+            elapsed = time.monotonic() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append({
+                "mode": mode,
+                "size_mb": size_mb,
+                "seconds": round(elapsed, 4),
+                "mb_per_s": round(size / 1024 / 1024 / elapsed, 2),
+                "peak_traced_mb": round(peak / 1024 / 1024, 2),
+            })
+    return results
+
+async def bench_reconnect(server: StandInServer, pdf_dir: Path, rounds: int) -> dict:
+    """Server restart to the first queued message being delivered again."""
+    recoveries = []
+    async with Harness(server, pdf_dir) as h:
+        for _ in range(rounds):
+            await server.stop()
+            await h.bus.commands.put(Command("play_pause"))
+            await asyncio.sleep(0.2)
+            server.frames.clear()
+            restarted = time.monotonic()
+            await server.start()
+            await server.wait_for(lambda: any(c == "play_pause" for _, c in server.frames))
+            recoveries.append(time.monotonic() - restarted)
+    return summary_ms(recoveries)
+
+async def main(args) -> dict:
+    server = StandInServer("127.0.0.1", args.port)
+    await server.start()
+    pdf_dir = Path(tempfile.mkdtemp(prefix="bench_pdf_"))
+    sizes = [int(s) for s in args.sizes.split(",")]
+    try:
+        results = {
+            "meta": {
+                "timestamp": time.time(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "websockets": websockets.__version__,
+            },
+            "command_to_wire": await bench_command_latency(server, pdf_dir, args.commands),
+            "pdf_throughput": (await bench_pdf_throughput(server, pdf_dir, sizes, "hex")
+                               + await bench_pdf_throughput(server, pdf_dir, sizes, "binary")),
+            "reconnect_recovery": await bench_reconnect(server, pdf_dir, args.reconnects),
+        }
+    finally:
+        await server.stop()
+    if resource is not None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        results["peak_rss_mb"] = round(maxrss / 1024 / (1024 if sys.platform == "darwin" else 1), 2)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline controller benchmark")
+    parser.add_argument("--output", default="bench_results.json", help="machine-readable results file")
+    parser.add_argument("--port", type=int, default=6799)
+    parser.add_argument("--commands", type=int, default=200, help="commands for the latency run")
+    parser.add_argument("--sizes", default="1,5,20", help="PDF sizes in MB, comma separated")
+    parser.add_argument("--reconnects", type=int, default=5)
+    parser.add_argument("--verbose", action="store_true", help="show app warnings/errors (e.g. during reconnects)")
+    args = parser.parse_args()
+    if not args.verbose:
+        logging.getLogger("app").setLevel(logging.CRITICAL)
+
+    results = asyncio.run(main(args))
+    Path(args.output).write_text(json.dumps(results, indent=2))
+    print(json.dumps(results, indent=2))
+    print(f"📊 Results written to {args.output}")
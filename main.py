@@ -4,14 +4,19 @@ Audio Transcription Controller v2
 Clean async-first architecture
 """
 import asyncio
-from app.lifecycle import run_app
-from app.config import load_config
+import sys
+from app.startup import StartupProfile
 
 def main():
     """Main entry point"""
     try:
-        cfg = load_config()
-        asyncio.run(run_app(cfg))
+        profile = StartupProfile("--profile-startup" in sys.argv[1:])
+        with profile.phase("import app.lifecycle"):
+            from app.lifecycle import run_app
+            from app.config import load_config
+        with profile.phase("load config"):
+            cfg = load_config()
+        asyncio.run(run_app(cfg, profile))
     except KeyboardInterrupt:
         print("\n👋 Application stopped by user")
     except Exception as e: